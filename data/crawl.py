@@ -0,0 +1,294 @@
+import os
+import json
+import time
+import queue
+import random
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import urlsplit
+
+# Crawl scheduler shared by facultyDataScraper.py and regulationsScraper.py.
+#
+# Jobs are fetched by a fixed number of worker threads. Every host gets at
+# most `per_host` fetches in flight and a token bucket of `rate` requests per
+# second (bursts of up to `burst`), so a large re-crawl cannot hammer the
+# college website. Failed fetches are retried with exponential backoff and
+# full jitter. Each worker keeps one browser for all of its jobs.
+#
+# Every URL is recorded (fetch time, bytes, parse time, attempts, error) and
+# the run is written to a JSON summary file, so scheduled crawls can be
+# monitored and compared.
+
+DEFAULT_WORKERS = 4
+DEFAULT_PER_HOST = 2
+DEFAULT_RATE = 1.0
+DEFAULT_BURST = 2
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 2.0
+DEFAULT_TIMEOUT = 60
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, and bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def summarize(values):
+    """Mean, p50, p95 and max of a list of milliseconds"""
+    values = sorted(values)
+    if not values:
+        return {"mean": None, "p50": None, "p95": None, "max": None}
+    return {
+        "mean": round(sum(values) / len(values), 1),
+        "p50": round(values[len(values) // 2], 1),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 1),
+        "max": round(values[-1], 1),
+    }
+
+
+class CrawlScheduler:
+    """Fetches and parses URLs politely, recording metrics for every URL"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST, rate=DEFAULT_RATE,
+                 burst=DEFAULT_BURST, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=DEFAULT_TIMEOUT):
+        if not rate > 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.rate = rate
+        self.burst = burst
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.hosts_lock = threading.Lock()
+        self.host_slots = {}
+        self.host_buckets = {}
+        self.records = []
+        self.records_lock = threading.Lock()
+        self.started_at = datetime.now()
+
+    def host_limits(self, host):
+        with self.hosts_lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.Semaphore(self.per_host)
+                self.host_buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.host_slots[host], self.host_buckets[host]
+
+    def fetch_with_retries(self, session, url, fetch, record):
+        slots, bucket = self.host_limits(record["host"])
+        for attempt in range(1, self.retries + 2):
+            record["attempts"] = attempt
+            # Hold the host slot before spending a token, and time only the fetch
+            with slots:
+                bucket.acquire()
+                start = time.perf_counter()
+                try:
+                    return fetch(session, url, self.timeout)
+                except Exception as e:
+                    record["error"] = f"{type(e).__name__}: {e}"
+                    if attempt > self.retries:
+                        raise
+                finally:
+                    record["fetch_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            # Full jitter keeps retries from many workers from lining up
+            delay = random.uniform(0, self.backoff * 2 ** (attempt - 1))
+            print(f"Retrying {url} in {delay:.1f}s ({record['error']})")
+            time.sleep(delay)
+
+    def new_record(self, url):
+        return {"url": url, "host": urlsplit(url).netloc, "ok": False, "attempts": 0,
+                "fetch_ms": None, "parse_ms": None, "bytes": 0, "error": None}
+
+    def process(self, session, url, payload, fetch, parse):
+        record = self.new_record(url)
+        result = None
+        try:
+            content = self.fetch_with_retries(session, url, fetch, record)
+            record["bytes"] = len(content.encode('utf-8') if isinstance(content, str) else content)
+
+            start = time.perf_counter()
+            try:
+                result = parse(url, payload, content)
+            finally:
+                record["parse_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            record["ok"] = result is not None
+            record["error"] = None if result is not None else "no data extracted"
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+            print(f"Error scraping {url}: {record['error']}")
+
+        with self.records_lock:
+            self.records.append(record)
+        return result
+
+    def run(self, jobs, fetch, parse, session_factory=None):
+        """Fetch and parse (url, payload) jobs; returns the parse results of the jobs that succeeded.
+
+        fetch(session, url, timeout) returns the page as str or bytes and may
+        raise to be retried. parse(url, payload, content) returns the result,
+        or None when the page held no data. Each worker thread opens one
+        session with session_factory (a context manager) for all its jobs.
+        """
+        pending = queue.Queue()
+        for job in jobs:
+            pending.put(job)
+        results = []
+        results_lock = threading.Lock()
+        session_errors = []
+
+        def work():
+            try:
+                with (session_factory() if session_factory else _no_session()) as session:
+                    while True:
+                        try:
+                            url, payload = pending.get_nowait()
+                        except queue.Empty:
+                            return
+                        result = self.process(session, url, payload, fetch, parse)
+                        if result is not None:
+                            with results_lock:
+                                results.append(result)
+            except Exception as e:
+                # e.g. the browser failed to launch; other workers keep going
+                error = f"{type(e).__name__}: {e}"
+                print(f"Crawl worker failed to open a session: {error}")
+                with results_lock:
+                    session_errors.append(error)
+
+        threads = [threading.Thread(target=work, daemon=True) for _ in range(min(self.workers, pending.qsize()))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Jobs left when every worker failed are recorded as failed, so the
+        # summary and exit status report them
+        while session_errors:
+            try:
+                url, _ = pending.get_nowait()
+            except queue.Empty:
+                break
+            record = self.new_record(url)
+            record["error"] = f"No crawl session: {session_errors[-1]}"
+            with self.records_lock:
+                self.records.append(record)
+        return results
+
+    @property
+    def failed(self):
+        return sum(1 for record in self.records if not record["ok"])
+
+    def summary(self, name):
+        finished_at = datetime.now()
+        hosts = {}
+        for record in self.records:
+            host = hosts.setdefault(record["host"], {"urls": 0, "failed": 0, "bytes": 0})
+            host["urls"] += 1
+            host["failed"] += not record["ok"]
+            host["bytes"] += record["bytes"]
+
+        return {
+            "crawl": name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "finished_at": finished_at.isoformat(timespec="seconds"),
+            "duration_s": round((finished_at - self.started_at).total_seconds(), 1),
+            "settings": {"workers": self.workers, "per_host": self.per_host, "rate": self.rate,
+                         "burst": self.burst, "retries": self.retries, "backoff": self.backoff,
+                         "timeout": self.timeout},
+            "urls": len(self.records),
+            "succeeded": len(self.records) - self.failed,
+            "failed": self.failed,
+            "retries": sum(max(0, record["attempts"] - 1) for record in self.records),
+            "bytes": sum(record["bytes"] for record in self.records),
+            "fetch_ms": summarize([r["fetch_ms"] for r in self.records if r["fetch_ms"] is not None]),
+            "parse_ms": summarize([r["parse_ms"] for r in self.records if r["parse_ms"] is not None]),
+            "hosts": hosts,
+            "results": self.records,
+        }
+
+    def write_summary(self, path, name):
+        summary = self.summary(name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(summary, file, indent=4)
+        os.replace(tmp_path, path)
+
+        print(f"Crawled {summary['urls']} URLs in {summary['duration_s']}s: {summary['succeeded']} succeeded, "
+              f"{summary['failed']} failed, {summary['retries']} retries, {summary['bytes']:,} bytes. "
+              f"Summary saved to {path}")
+        return summary
+
+
+@contextmanager
+def _no_session():
+    yield None
+
+
+@contextmanager
+def playwright_session():
+    """One headless Chromium context, reused for every page a worker fetches"""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        try:
+            yield browser.new_context(ignore_https_errors=True)
+        finally:
+            browser.close()
+
+
+def fetch_page(context, url, timeout):
+    """HTML of url once the network is idle"""
+    page = context.new_page()
+    try:
+        response = page.goto(url, wait_until="networkidle", timeout=timeout * 1000)
+        if response is not None and response.status >= 400:
+            raise RuntimeError(f"HTTP {response.status}")
+        return page.content()
+    finally:
+        page.close()
+
+
+def positive_float(value):
+    number = float(value)
+    if not number > 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return number
+
+
+def add_arguments(parser, summary):
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="pages fetched in parallel")
+    parser.add_argument("--per-host", type=int, default=DEFAULT_PER_HOST, help="fetches in flight per host")
+    parser.add_argument("--rate", type=positive_float, default=DEFAULT_RATE, help="requests per second per host")
+    parser.add_argument("--burst", type=int, default=DEFAULT_BURST, help="requests a host may get at once")
+    parser.add_argument("--retries", type=int, default=DEFAULT_RETRIES, help="retries of a failed fetch")
+    parser.add_argument("--backoff", type=float, default=DEFAULT_BACKOFF,
+                        help="base of the exponential retry backoff in seconds")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT, help="page load timeout in seconds")
+    parser.add_argument("--summary", default=summary, help="where to write the crawl metrics")
+
+
+def from_arguments(args):
+    return CrawlScheduler(workers=args.workers, per_host=args.per_host, rate=args.rate, burst=args.burst,
+                          retries=args.retries, backoff=args.backoff, timeout=args.timeout)
@@ -1,7 +1,9 @@
-from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
 import os
+import sys
 import json
+import argparse
+import crawl
 
 
 # Create necessary directories
@@ -134,53 +136,54 @@ def extract_faculty_info(html_content):
     return faculty_info
 
 
-def scrape_faculty_profile(url):
-    """Scrape a faculty profile using Playwright"""
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        context = browser.new_context(ignore_https_errors=True)
-        page = context.new_page()
+def write_profile(faculty_info):
+    with open(f"faculty_data/{faculty_info['name']}.json", 'w', encoding='utf-8') as f:
+        json.dump(faculty_info, f, indent=4)
 
-        try:
-            page.goto(url, wait_until="networkidle")
-            html_content = page.content()
-            faculty_info = extract_faculty_info(html_content)
-            faculty_info['url'] = url
 
-            # Extract faculty ID from URL
-            faculty_id = url.split('?')[1] if '?' in url else 'unknown'
-            name = faculty_info['name']
-            faculty_info['url_id'] = faculty_id
+def parse_faculty_profile(url, payload, html_content):
+    """Extract and save a faculty profile from its page"""
+    faculty_info = extract_faculty_info(html_content)
+    faculty_info['url'] = url
 
-            # Save the profile image if available
-            if 'image_url' in faculty_info:
-                img_url = faculty_info['image_url']
-                if img_url.startswith('../'):
-                    img_url = 'https://www.psgtech.edu/' + img_url[3:]
+    # Extract faculty ID from URL
+    faculty_id = url.split('?')[1] if '?' in url else 'unknown'
+    name = faculty_info['name']
+    faculty_info['url_id'] = faculty_id
 
-                # Create directory for images if it doesn't exist
-                os.makedirs('faculty_images', exist_ok=True)
+    # Save the extracted information as JSON; local_image_path is added once the image is saved
+    write_profile(faculty_info)
 
-                img_path = f"faculty_images/{name}.jpg"
+    print(f"Successfully extracted information for {name}")
+    print(f"Data saved to faculty_data/{name}.json")
+    return faculty_info
 
-                # Download image
-                img_page = context.new_page()
-                img_page.goto(img_url, wait_until="networkidle")
-                img_page.screenshot(path=img_path)
-                img_page.close()
 
-                faculty_info['local_image_path'] = img_path
+def fetch_image(context, url, timeout):
+    """Screenshot of an image page, as JPEG bytes (saved as faculty_images/<name>.jpg)"""
+    page = context.new_page()
+    try:
+        page.goto(url, wait_until="networkidle", timeout=timeout * 1000)
+        return page.screenshot(type="jpeg")
+    finally:
+        page.close()
 
-            return faculty_info
 
-        except Exception as e:
-            print(f"Error scraping {url}: {str(e)}")
-            return None
-        finally:
-            browser.close()
+def save_image(url, faculty_info, image):
+    """Save a profile image and record its path in the saved profile"""
+    img_path = f"faculty_images/{faculty_info['name']}.jpg"
+    with open(img_path, 'wb') as f:
+        f.write(image)
+    faculty_info['local_image_path'] = img_path
+    write_profile(faculty_info)
+    return img_path
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape the faculty profiles listed in faculties.json")
+    crawl.add_arguments(parser, summary="faculty_crawl_summary.json")
+    args = parser.parse_args()
+
     # Create directories for storing data
     os.makedirs('faculty_data', exist_ok=True)
     os.makedirs('faculty_images', exist_ok=True)
@@ -189,40 +192,40 @@ def main():
     try:
         with open('faculties.json', 'r', encoding='utf-8') as f:
             faculty_data = json.load(f)
+    except FileNotFoundError:
+        print("Error: faculties.json file not found.")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print("Error: Invalid JSON format in faculties.json file.")
+        sys.exit(1)
 
-        # Extract URLs from the faculty data
-        urls = []
-        for course in faculty_data:
-            for faculty_name, url in faculty_data[course].items():
+    # Extract URLs from the faculty data
+    urls = []
+    for course in faculty_data:
+        for faculty_name, url in faculty_data[course].items():
+            if url is not None and url not in urls:
                 urls.append(url)
 
-        print(f"Loaded {len(urls)} faculty URLs from faculties.json")
+    print(f"Loaded {len(urls)} faculty URLs from faculties.json")
 
-        # Process each URL
-        for url in urls:
-            if url is not None:
-                # Scrape the faculty profile
-                faculty_info = scrape_faculty_profile(url)
+    scheduler = crawl.from_arguments(args)
+    profiles = scheduler.run([(url, None) for url in urls], crawl.fetch_page, parse_faculty_profile,
+                             session_factory=crawl.playwright_session)
 
-                if faculty_info:
-                    name = faculty_info['name']
-                    # Save the extracted information as JSON
-                    with open(f"faculty_data/{name}.json", 'w', encoding='utf-8') as f:
-                        json.dump(faculty_info, f, indent=4)
+    # Profile images are fetched through the same scheduler and host limits
+    images = []
+    for faculty_info in profiles:
+        if 'image_url' not in faculty_info:
+            continue
+        img_url = faculty_info['image_url']
+        if img_url.startswith('../'):
+            img_url = 'https://www.psgtech.edu/' + img_url[3:]
+        images.append((img_url, faculty_info))
+    scheduler.run(images, fetch_image, save_image, session_factory=crawl.playwright_session)
 
-                    print(f"Successfully extracted information for {name}")
-                    print(f"Data saved to faculty_data/{name}.json")
-                else:
-                    print(f"Failed to extract faculty information for {url}")
-
-    except FileNotFoundError:
-        print("Error: faculties.json file not found.")
-    except json.JSONDecodeError:
-        print("Error: Invalid JSON format in faculties.json file.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {str(e)}")
+    scheduler.write_summary(args.summary, "faculty")
+    sys.exit(1 if scheduler.failed else 0)
 
 
 if __name__ == "__main__":
     main()
-
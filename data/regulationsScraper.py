@@ -1,8 +1,10 @@
-from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
 import os
-import json
 import re
+import sys
+import json
+import argparse
+import crawl
 
 # Create necessary directories
 os.makedirs('regulations', exist_ok=True)
@@ -147,37 +149,29 @@ def extract_program_info(html_content, program_name, year):
     return program_info
 
 
-def scrape_program_syllabus(url, program_name, year):
-    """Scrape a program syllabus using Playwright"""
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        context = browser.new_context(ignore_https_errors=True)
-        page = context.new_page()
-
-        try:
-            page.goto(url, wait_until="networkidle", timeout=60000)
-            html_content = page.content()
-            program_info = extract_program_info(html_content, program_name, year)
-            program_info['url'] = url
+def parse_program_syllabus(url, payload, html_content):
+    """Extract and save a program syllabus from its page"""
+    program_name, year, coordinator = payload
+    program_info = extract_program_info(html_content, program_name, year)
+    program_info['url'] = url
+    program_info['coordinator'] = coordinator
 
-            # Save the extracted information as JSON
-            filename = f"regulations/{program_name.replace(' ', '_')}_{year}.json"
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(program_info, f, indent=4)
+    # Save the extracted information as JSON
+    filename = f"regulations/{program_name.replace(' ', '_')}_{year}.json"
+    with open(filename, 'w', encoding='utf-8') as f:
+        json.dump(program_info, f, indent=4)
 
-            print(f"Successfully extracted information for {program_name} ({year})")
-            print(f"Data saved to {filename}")
+    print(f"Successfully extracted information for {program_name} ({year})")
+    print(f"Data saved to {filename}")
 
-            return program_info
-
-        except Exception as e:
-            print(f"Error scraping {url}: {str(e)}")
-            return None
-        finally:
-            browser.close()
+    return program_info
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Scrape the program syllabi listed in regulations.json")
+    crawl.add_arguments(parser, summary="regulations_crawl_summary.json")
+    args = parser.parse_args()
+
     # Create directory for storing data
     os.makedirs('regulations', exist_ok=True)
 
@@ -185,41 +179,30 @@ def main():
     try:
         with open('regulations.json', 'r', encoding='utf-8') as f:
             regulations_data = json.load(f)
+    except FileNotFoundError:
+        print("Error: regulations.json file not found.")
+        sys.exit(1)
+    except json.JSONDecodeError:
+        print("Error: Invalid JSON format in regulations.json file.")
+        sys.exit(1)
 
-        print(f"Loaded regulations data for {len(regulations_data)} programs")
-
-        # Process each program
-        for program_name, program_details in regulations_data.items():
-            coordinator = program_details.get('Program Co-ordinator', 'Not specified')
-            years = program_details.get('Year', [])
-            urls = program_details.get('url', [])
-
-            print(f"\nProcessing {program_name}")
-            print(f"Coordinator: {coordinator}")
-
-            # Process each year/URL combination
-            for i in range(min(len(years), len(urls))):
-                year = years[i]
-                url = urls[i]
+    print(f"Loaded regulations data for {len(regulations_data)} programs")
 
-                print(f"Scraping syllabus for year {year} from {url}")
-                program_info = scrape_program_syllabus(url, program_name, year)
+    # One job per program year/URL combination
+    jobs = []
+    for program_name, program_details in regulations_data.items():
+        coordinator = program_details.get('Program Co-ordinator', 'Not specified')
+        years = program_details.get('Year', [])
+        urls = program_details.get('url', [])
 
-                if program_info:
-                    # Add coordinator information
-                    program_info['coordinator'] = coordinator
+        for i in range(min(len(years), len(urls))):
+            jobs.append((urls[i], (program_name, years[i], coordinator)))
 
-                    # Update the saved JSON with coordinator info
-                    filename = f"regulations/{program_name.replace(' ', '_')}_{year}.json"
-                    with open(filename, 'w', encoding='utf-8') as f:
-                        json.dump(program_info, f, indent=4)
+    scheduler = crawl.from_arguments(args)
+    scheduler.run(jobs, crawl.fetch_page, parse_program_syllabus, session_factory=crawl.playwright_session)
 
-    except FileNotFoundError:
-        print("Error: regulations.json file not found.")
-    except json.JSONDecodeError:
-        print("Error: Invalid JSON format in regulations.json file.")
-    except Exception as e:
-        print(f"An unexpected error occurred: {str(e)}")
+    scheduler.write_summary(args.summary, "regulations")
+    sys.exit(1 if scheduler.failed else 0)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+
+# Bulk question answering, e.g. pre-answering an FAQ list or a nightly
+# evaluation set. Questions the FAQ store (faq.py) answers are written right
+# away; the others are embedded in one batched call and searched in one
+# multi-query FAISS call, then answered with at most --concurrency LLM calls
+# in flight. No conversation memory is shared between questions.
+# Results are written as JSON Lines, in the request_id / title / body shape of
+# requests.jsonl, as soon as each answer arrives.
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "16"))
+
+
+def load_batch(path):
+    """Read questions from a .txt file (one per line) or a .jsonl file.
+
+    JSONL lines may carry a request_id and the question in `question` or `title`.
+    Returns a list of (request_id, question) pairs.
+    """
+    questions = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                question = record.get("question") or record.get("title")
+                request_id = record.get("request_id", f"q-{number:04d}")
+            else:
+                question, request_id = line, f"q-{number:04d}"
+            if question:
+                questions.append((request_id, question))
+    return questions
+
+
+def retrieve_batch(questions, fetch_k, top_k):
+    """Embed every question in one call, search them together and rerank each candidate list"""
+    import chat
+    import index_store
+    import rerank
+
+    vectors = chat.embeddings.embed_documents(questions)
+    candidates = index_store.search_batch(chat.get_vectorstore(), vectors, max(fetch_k, top_k))
+    if rerank.RERANKER == "none":
+        return [[doc for doc, _ in row[:top_k]] for row in candidates]
+    return [rerank.rerank_candidates(question, row, top_k=top_k) for question, row in zip(questions, candidates)]
+
+
+async def answer(semaphore, request_id, question, documents):
+    import chat
+
+    prompt = chat.QA_PROMPT.format(
+        context="\n\n".join(doc.page_content for doc in documents),
+        question=question,
+        chat_history=""
+    )
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            message = await chat.llm.ainvoke(prompt)
+        except Exception as e:
+            return {"request_id": request_id, "title": question, "error": str(e)}
+
+    return {
+        "request_id": request_id,
+        "title": question,
+        "body": message.content,
+        "sources": [doc.metadata.get('name', 'Unknown') for doc in documents],
+        "latency_ms": round((time.perf_counter() - start) * 1000, 1),
+        "index_version": chat.get_index_version(),
+    }
+
+
+async def run_batch(questions, output, concurrency=BATCH_CONCURRENCY, fetch_k=None, top_k=None):
+    """Answer (request_id, question) pairs, writing one JSON line per answer to output as they finish"""
+    import chat
+    import rerank
+
+    chat.load()
+    start = time.perf_counter()
+
+    # Questions the FAQ store answers need neither retrieval nor the LLM
+    faq_store = chat.get_faq()
+    remaining = []
+    for request_id, question in questions:
+        qa = faq_store.match(question)
+        if qa is None:
+            remaining.append((request_id, question))
+            continue
+        output.write(json.dumps({
+            "request_id": request_id,
+            "title": question,
+            "body": qa["answer"],
+            "sources": [qa["source"]],
+            "faq": True,
+            "index_version": chat.get_index_version(),
+        }) + "\n")
+    output.flush()
+
+    documents = retrieve_batch(
+        [question for _, question in remaining],
+        fetch_k or rerank.RERANK_FETCH_K,
+        top_k or rerank.RERANK_TOP_K
+    ) if remaining else []
+    print(f"Answered {len(questions) - len(remaining)} questions from the FAQ, retrieved context for "
+          f"{len(remaining)} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    tasks = [answer(semaphore, request_id, question, docs)
+             for (request_id, question), docs in zip(remaining, documents)]
+
+    failures = 0
+    for finished in asyncio.as_completed(tasks):
+        result = await finished
+        failures += "error" in result
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+    print(f"Answered {len(questions) - failures}/{len(questions)} questions in "
+          f"{time.perf_counter() - start:.1f}s", file=sys.stderr)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a batch of questions and write the answers as JSON Lines")
+    parser.add_argument("questions", help="a .txt file with one question per line, or a .jsonl file")
+    parser.add_argument("-o", "--output", help="output .jsonl file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="LLM calls in flight")
+    parser.add_argument("--fetch-k", type=int, help="candidates fetched per question before reranking")
+    parser.add_argument("--top-k", type=int, help="documents passed to the prompt per question")
+    args = parser.parse_args()
+
+    questions = load_batch(args.questions)
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        failures = asyncio.run(run_batch(questions, output, args.concurrency, args.fetch_k, args.top_k))
+    finally:
+        if args.output:
+            output.close()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
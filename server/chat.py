@@ -1,27 +1,70 @@
 import os
-from langchain_community.vectorstores import FAISS
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+import time
+import threading
 from dotenv import load_dotenv
 
+# Importing this module is cheap: langchain, FAISS and the API clients are
+# only imported and created by load(), which answer_query() calls on first use.
+
 # Load environment variables
 load_dotenv()
 
-# Ensure you have your OpenAI API key
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
-
-# Initialize OpenAI embeddings
-embeddings = OpenAIEmbeddings()
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faiss_index")
+
+# How often (in seconds) to check whether embeddings.py published a new index
+RELOAD_INTERVAL = float(os.getenv("INDEX_RELOAD_INTERVAL", "2"))
+
+_index_lock = threading.Lock()
+_index = {"version": None, "vectorstore": None, "faq": None, "checked_at": 0.0}
+
+
+def get_vectorstore():
+    """Return the current FAISS index, swapping in a newly published version if there is one"""
+    now = time.monotonic()
+    if _index["vectorstore"] is not None and now - _index["checked_at"] < RELOAD_INTERVAL:
+        return _index["vectorstore"]
+
+    import index_store
+    import faq
+
+    load()
+    # One thread checks CURRENT and loads a new version (checksums and all)
+    # while the others keep serving the current one; only the first load waits
+    if not _index_lock.acquire(blocking=_index["vectorstore"] is None):
+        return _index["vectorstore"]
+    try:
+        if _index["vectorstore"] is not None and time.monotonic() - _index["checked_at"] < RELOAD_INTERVAL:
+            return _index["vectorstore"]
+        version = index_store.current_version(INDEX_DIR)
+        if version != _index["version"] or _index["vectorstore"] is None:
+            try:
+                version, vectorstore = index_store.load_index(INDEX_DIR, embeddings, version)
+                faq_store = faq.FaqStore(index_store.load_faq(INDEX_DIR, version))
+            except (OSError, ValueError) as e:
+                # Keep serving the version we have if the new one is unusable
+                if _index["vectorstore"] is None:
+                    raise
+                print(f"Error loading FAISS index {version}: {str(e)}")
+                _index["checked_at"] = time.monotonic()
+                return _index["vectorstore"]
+            if _index["version"] is not None:
+                print(f"Reloaded FAISS index {version}")
+            _index.update(version=version, vectorstore=vectorstore, faq=faq_store)
+        _index["checked_at"] = time.monotonic()
+        return _index["vectorstore"]
+    finally:
+        _index_lock.release()
+
+
+def get_index_version():
+    return _index["version"]
+
+
+def get_faq():
+    """FAQ store published with the current index"""
+    get_vectorstore()
+    return _index["faq"]
 
-# Load your existing FAISS index
-vectorstore = FAISS.load_local("server/faiss_index", embeddings, allow_dangerous_deserialization=True)
-
-# Create a retriever with k=40 to get more context
-retriever = vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": 3})
 
 # Define custom prompt templates
 qa_prompt_template = """
@@ -41,37 +84,113 @@ Chat History:
 Answer:
 """
 
-QA_PROMPT = PromptTemplate(
-    template=qa_prompt_template,
-    input_variables=["context", "question", "chat_history"]
-)
-
-# Initialize conversation memory
-memory = ConversationBufferMemory(
-    memory_key="chat_history",
-    return_messages=True,
-    output_key="answer"
-)
-
-# Initialize GPT-4o model
-llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=1)
-
-# Create the conversational chain
-conversation_chain = ConversationalRetrievalChain.from_llm(
-    llm=llm,
-    retriever=retriever,
-    memory=memory,
-    combine_docs_chain_kwargs={"prompt": QA_PROMPT},
-    return_source_documents=True
-)
-
-
-# Function to query the system
-def answer_query(query):
-    result = conversation_chain({"question": query})
+# Created by load()
+embeddings = None
+QA_PROMPT = None
+memory = None
+llm = None
+_load_lock = threading.Lock()
+
+
+def load():
+    """Create the embeddings, LLM, prompt and conversation memory and open the index.
+
+    Safe to call repeatedly; only the first call does any work.
+    """
+    global embeddings, QA_PROMPT, memory, llm
+    if llm is not None:
+        return
+
+    with _load_lock:
+        if llm is not None:
+            return
+
+        from langchain_openai import ChatOpenAI
+        from langchain.memory import ConversationBufferMemory
+        from langchain.prompts import PromptTemplate
+        import embedding_backends
+        import request_context
+
+        # Ensure you have your OpenAI API key
+        if not os.getenv("OPENAI_API_KEY"):
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+
+        # Initialize the embeddings the index was built with (EMBEDDING_BACKEND);
+        # within a request each text is embedded once (see request_context.py)
+        embeddings = request_context.RequestScopedEmbeddings(embedding_backends.get_embeddings())
+
+        QA_PROMPT = PromptTemplate(
+            template=qa_prompt_template,
+            input_variables=["context", "question", "chat_history"]
+        )
+
+        # Initialize conversation memory
+        memory = ConversationBufferMemory(
+            memory_key="chat_history",
+            return_messages=True,
+            output_key="answer"
+        )
+
+        # Initialize GPT-4o model; set last because it marks load() as done
+        llm = ChatOpenAI(model_name="gpt-4o-mini", temperature=1)
+
+    get_vectorstore()
+
+
+def create_chain(memory=None):
+    """Create the conversational chain over the current index"""
+    from langchain.chains import ConversationalRetrievalChain
+    import rerank
+
+    load()
+    # Over-fetches candidates and keeps only the best reranked few for QA_PROMPT
+    retriever = rerank.create_retriever(get_vectorstore())
+    return ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        retriever=retriever,
+        memory=memory,
+        combine_docs_chain_kwargs={"prompt": QA_PROMPT},
+        return_source_documents=True
+    )
+
+
+def faq_response(query, qa, chat_history=None):
+    from langchain.schema import Document
+
+    if chat_history is None:
+        # Keep the shared conversation coherent for follow-up questions
+        memory.save_context({"question": query}, {"answer": qa["answer"]})
+    return {
+        "answer": qa["answer"],
+        "source_documents": [Document(page_content=qa["answer"], metadata={"name": qa["source"], "faq": True})]
+    }
+
+
+# Function to query the system.
+# Without chat_history the shared conversation memory is used; with it
+# (a list of (question, answer) pairs) the call is stateless, which is
+# what the multi-process server uses.
+# The returned "request" holds the request's embedding calls and token counts.
+def answer_query(query, chat_history=None):
+    import request_context
+
+    load()
+    with request_context.RequestContext(query, chat_history) as context:
+        # Frequent questions are answered from the FAQ store without calling the LLM
+        qa = get_faq().match(context.question)
+        if qa is not None:
+            response = faq_response(context.question, qa, chat_history)
+            response["request"] = context.stats()
+            return response
+
+        if chat_history is None:
+            result = create_chain(memory)({"question": context.question})
+        else:
+            result = create_chain()({"question": context.question, "chat_history": chat_history})
     return {
         "answer": result["answer"],
-        "source_documents": result["source_documents"]
+        "source_documents": result["source_documents"],
+        "request": context.stats()
     }
 
 
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Embedding backends, selected with EMBEDDING_BACKEND:
+#   openai  OpenAIEmbeddings, needs OPENAI_API_KEY (default)
+#   local   a sentence-transformer exported to ONNX, run on the CPU. Set
+#           LOCAL_EMBEDDING_MODEL to a directory holding model.onnx and
+#           tokenizer.json (e.g. an ONNX export of all-MiniLM-L6-v2); needs
+#           pip install onnxruntime tokenizers
+# Index manifests record the backend and model that built them, and an index
+# is only ever queried with the same backend and model.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "models/all-MiniLM-L6-v2")
+LOCAL_EMBEDDING_BATCH_SIZE = int(os.getenv("LOCAL_EMBEDDING_BATCH_SIZE", "32"))
+LOCAL_EMBEDDING_THREADS = int(os.getenv("LOCAL_EMBEDDING_THREADS", str(os.cpu_count() or 1)))
+LOCAL_EMBEDDING_MAX_LENGTH = int(os.getenv("LOCAL_EMBEDDING_MAX_LENGTH", "256"))
+
+
+class LocalEmbeddings(Embeddings):
+    """Sentence-transformer embeddings computed on the CPU with ONNX Runtime and NumPy"""
+
+    backend = "local"
+
+    def __init__(self, model_dir=LOCAL_EMBEDDING_MODEL, batch_size=LOCAL_EMBEDDING_BATCH_SIZE,
+                 threads=LOCAL_EMBEDDING_THREADS, max_length=LOCAL_EMBEDDING_MAX_LENGTH):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("EMBEDDING_BACKEND=local needs onnxruntime and tokenizers: "
+                              "pip install onnxruntime tokenizers")
+
+        self.model = os.path.basename(os.path.normpath(model_dir))
+        self.batch_size = batch_size
+        self.threads = max(1, threads)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        # Parallelism comes from running batches on the thread pool
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def _embed_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype='int64')
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype='int64')
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over the real tokens, then L2 normalization
+        mask = attention_mask[:, :, None].astype('float32')
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        if len(batches) <= 1:
+            return [vector for batch in batches for vector in self._embed_batch(batch)]
+        with ThreadPoolExecutor(max_workers=min(self.threads, len(batches))) as executor:
+            return [vector for vectors in executor.map(self._embed_batch, batches) for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed_batch([text])[0]
+
+
+def get_embeddings(backend=None):
+    """Create the embeddings for the configured backend"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY not found in environment variables")
+        return OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, openai_api_key=api_key)
+    if backend == "local":
+        return LocalEmbeddings()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+def describe(embeddings):
+    """Backend and model of an embeddings instance, as recorded in index manifests"""
+    return {
+        "backend": getattr(embeddings, "backend", "openai"),
+        "model": embeddings.model,
+    }
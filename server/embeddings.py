@@ -1,33 +1,120 @@
 import os
+import sys
 import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain.schema import Document
-import PyPDF2
 from datetime import  datetime
+from itertools import islice
+import publications
+import jsonstream
 load_dotenv()
 
-api_key = os.getenv("OPENAI_API_KEY")
-if not api_key:
-    raise ValueError("OPENAI_API_KEY not found in environment variables")
+# Importing this module has no side effects and pulls in no heavy
+# dependencies: langchain, FAISS, PyPDF2 and the embeddings client are only
+# imported when build() or the CLI needs them.
 
-embeddings = OpenAIEmbeddings(openai_api_key=api_key)
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(SERVER_DIR)
+SOURCES_PATH = os.path.join(SERVER_DIR, "sources.yaml")
+CACHE_DIR = os.path.join(SERVER_DIR, "build_cache")
+INDEX_DIR = os.path.join(SERVER_DIR, "faiss_index")
 
-def load_faculty_data(directory):
-    faculty_data = []
-    for filename in os.listdir(directory):
+# Documents are rendered lazily and embedded EMBED_BATCH_SIZE at a time, so a
+# source is never held in memory as a whole while it is built
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+_embeddings = None
+
+
+def get_embeddings():
+    """OpenAI or a local CPU model, chosen with EMBEDDING_BACKEND; created on first use"""
+    global _embeddings
+    if _embeddings is None:
+        import embedding_backends
+        _embeddings = embedding_backends.get_embeddings()
+    return _embeddings
+
+
+def iter_json_directory(directory):
+    """Parsed *.json files of a directory, one at a time"""
+    for filename in sorted(os.listdir(directory)):
         if filename.endswith(".json"):
             with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
                 try:
-                    faculty_data.append(json.load(file))
-                    print(f"Loaded {filename}")
+                    record = json.load(file)
                 except json.JSONDecodeError:
                     print(f"Error loading {filename}: Invalid JSON")
-    return faculty_data
+                    continue
+            print(f"Loaded {filename}")
+            yield record
+
+
+def load_json_directory(directory):
+    return list(iter_json_directory(directory))
+
+
+def iter_json_stream(directory, key):
+    """(header, items) for every *.json file of a directory, where items yields
+    the elements of the file's `key` array one at a time and header holds the
+    other top-level fields"""
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            path = os.path.join(directory, filename)
+            try:
+                header = jsonstream.read_header(path, (key,))
+            except ValueError:
+                print(f"Error loading {filename}: Invalid JSON")
+                continue
+            print(f"Streaming {filename}")
+            yield header, jsonstream.iter_items(path, key)
+
+
+def load_faculty_data(directory):
+    return load_json_directory(directory)
+
+
+def create_department_text(file_path):
+    # Read JSON data from the file
+    with open(file_path, 'r', encoding='utf-8') as file:
+        department = json.load(file)
+
+    text = f"Department: {department.get('name', 'Unknown')} ({department.get('short_name', 'Unknown')})\n"
+    text += f"College: {department.get('college', 'Unknown')}\n"
+    text += f"Head of the Department (HOD): {department.get('hod', 'Unknown')}\n"
+    text += f"Director: {department.get('director', 'Unknown')}\n"
+
+    return text
+
+
+def create_faculty_publications_text(faculty):
+    text = "Selected Publications:\n"
+    for i, pub in enumerate(faculty['publications']):
+        if isinstance(pub, dict):
+            text += f"- {pub.get('title', 'Unknown')} ({pub.get('year', 'Unknown')})\n"
+        else:
+            text += f"- {pub}\n"
+    return text
 
 
-def create_faculty_text(faculty):
+def create_faculty_activities_text(faculty):
+    # Profile entries that are not publications: programmes attended, courses, patents
+    activities = [pub for pub in faculty['publications']
+                  if isinstance(pub, dict) and not publications.is_publication(pub)]
+    if not activities:
+        return ""
+
+    text = "Programmes and Other Activities:\n"
+    for activity in activities:
+        text += f"- {activity.get('journal', 'Unknown')} ({activity.get('title', '')} - {activity.get('year', '')}"
+        text += f", {activity['role']})\n" if activity.get('role') else ")\n"
+    return text
+
+
+def create_faculty_text(faculty, include_publications=True):
+    # With include_publications off the publications are left to the
+    # `publications` source, which embeds each of them once
+
     text = f"Name: {faculty.get('name', 'Unknown')}\n"
     text += f"Academic Title: {faculty.get('academic_title', 'Unknown')}\n"
     text += f"Department: {faculty.get('department', 'Unknown')}\n"
@@ -53,18 +140,18 @@ def create_faculty_text(faculty):
         text += f"Subject Expertise: {faculty['subject_expertise']}\n"
 
 
-    text += "Selected Publications:\n"
-    for i, pub in enumerate(faculty['publications']):
-        if isinstance(pub, dict):
-            text += f"- {pub.get('title', 'Unknown')} ({pub.get('year', 'Unknown')})\n"
-        else:
-            text += f"- {pub}\n"
+    if include_publications:
+        text += create_faculty_publications_text(faculty)
+    else:
+        text += create_faculty_activities_text(faculty)
 
     return text
 
 
 def create_placement_text(path):
     #read text from pdf at path
+    import PyPDF2
+
     text = ""
 
     try:
@@ -90,16 +177,7 @@ def create_placement_text(path):
 
 
 def load_regulations_data(directory):
-    regulations_data = []
-    for filename in os.listdir(directory):
-        if filename.endswith(".json"):
-            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as file:
-                try:
-                    regulations_data.append(json.load(file))
-                    print(f"Loaded {filename}")
-                except json.JSONDecodeError:
-                    print(f"Error loading {filename}: Invalid JSON")
-    return regulations_data
+    return iter_json_stream(directory, 'courses')
 
 
 def create_course_text(course):
@@ -130,16 +208,24 @@ def create_course_text(course):
     return text
 
 
-def create_regulation_text(regulation):
+def create_regulation_header_text(regulation):
     text = f"Program: {regulation.get('program_name', 'Unknown')}\n"
     text += f"Year: {regulation.get('year', 'Unknown')}\n"
     text += f"Coordinator: {regulation.get('coordinator', 'Unknown')}\n"
     text += f"URL: {regulation.get('url', 'Unknown')}\n\n"
 
     text += "Courses:\n"
+    return text
+
+
+def create_regulation_course_text(course):
+    return "\n" + "-" * 50 + "\n" + create_course_text(course)
+
+
+def create_regulation_text(regulation):
+    text = create_regulation_header_text(regulation)
     for course in regulation.get('courses', []):
-        text += "\n" + "-" * 50 + "\n"
-        text += create_course_text(course)
+        text += create_regulation_course_text(course)
 
     return text
 
@@ -370,71 +456,369 @@ def create_phd_completed_text(file_path):
 
     return text
 
-# Load faculty data
-faculty_data = load_faculty_data("/Users/codit/PycharmProjects/ChatAMCS/data/faculty_data")
-regulation_data = load_regulations_data("/Users/codit/PycharmProjects/ChatAMCS/data/regulations")
-print(f"Loaded {len(faculty_data)} faculty profiles")
-print(f"Loaded {len(regulation_data)} regulation profiles")
-
-# Create documents for FAISS
-documents = []
-for faculty in faculty_data:
-    text = create_faculty_text(faculty)
-    doc = Document(page_content=text, metadata={"name": faculty.get('name', 'Unknown')})
-    documents.append(doc)
-
-for regulation in regulation_data:
-    text = create_regulation_text(regulation)
-    doc = Document(page_content=text, metadata={"name": regulation.get('Program', 'Unknown')})
-    documents.append(doc)
-
-text = create_placement_text('/Users/codit/PycharmProjects/ChatAMCS/data/placement/MSc_Brochure_2023.pdf')
-doc = Document(page_content=text, metadata={"name": 'Placement Data'})
-documents.append(doc)
-
-print("Loaded Placement details")
-
-text = create_publication_text('/Users/codit/PycharmProjects/ChatAMCS/data/book.json')
-doc = Document(page_content=text, metadata={"name": 'Publication Data'})
-documents.append(doc)
-print("Loaded Publication details")
-
-text = create_conference_text('/Users/codit/PycharmProjects/ChatAMCS/data/Conference_Publications.json')
-doc = Document(page_content=text, metadata={"name": 'Conference Data'})
-documents.append(doc)
-print("Loaded Conference Publication details")
-
-text = create_conference_attended_text('/Users/codit/PycharmProjects/ChatAMCS/data/conferences.json')
-doc = Document(page_content=text, metadata={"name": 'Conference Attended'})
-documents.append(doc)
-print("Loaded Conference Attended details")
-
-text = create_events_organized_text('/Users/codit/PycharmProjects/ChatAMCS/data/Events_Organized.json')
-doc = Document(page_content=text, metadata={"name": 'Events Organized'})
-documents.append(doc)
-print("Loaded Events Organized details")
-
-text = create_journal_publications_text('/Users/codit/PycharmProjects/ChatAMCS/data/Journal_Publication.json')
-doc = Document(page_content=text, metadata={"name": 'Journal Publications'})
-documents.append(doc)
-print("Loaded Journal Publications details")
-
-text = create_labs_text('/Users/codit/PycharmProjects/ChatAMCS/data/labs.json')
-doc = Document(page_content=text, metadata={"name": 'Laboratory Facilities'})
-documents.append(doc)
-print("Loaded Laboratory Facilities details")
-
-text = create_phd_completed_text('/Users/codit/PycharmProjects/ChatAMCS/data/phd.json')
-doc = Document(page_content=text, metadata={"name": 'PhD Completed'})
-documents.append(doc)
-print("Loaded PhD Completed details")
-
-print(f"Created {len(documents)} documents")
-
-# Create FAISS index
-vectorstore = FAISS.from_documents(documents, embeddings)
-
-#Save the FAISS index
-vectorstore.save_local("server/faiss_index")
-
-print("FAISS index created and saved successfully.")
+
+
+# Renderers that can be referenced from sources.yaml
+RENDERERS = {
+    "create_department_text": create_department_text,
+    "create_faculty_text": create_faculty_text,
+    "create_placement_text": create_placement_text,
+    "create_regulation_text": create_regulation_text,
+    "create_regulation_header_text": create_regulation_header_text,
+    "create_regulation_course_text": create_regulation_course_text,
+    "create_publication_text": create_publication_text,
+    "create_conference_text": create_conference_text,
+    "create_conference_attended_text": create_conference_attended_text,
+    "create_events_organized_text": create_events_organized_text,
+    "create_journal_publications_text": create_journal_publications_text,
+    "create_labs_text": create_labs_text,
+    "create_phd_completed_text": create_phd_completed_text,
+    "create_publication_record_text": publications.create_publication_record_text,
+    "create_publications_header_text": publications.create_publications_header_text,
+    "create_publication_line_text": publications.create_publication_line_text,
+}
+
+LOADERS = ("file", "json_directory", "json_stream", "publications")
+CHUNKING_POLICIES = ("whole", "split", "pack")
+
+
+def load_registry(path=SOURCES_PATH):
+    import yaml
+
+    with open(path, 'r', encoding='utf-8') as file:
+        return yaml.safe_load(file) or {}
+
+
+def load_sources(path=SOURCES_PATH):
+    """Load and validate the source registry"""
+    sources = load_registry(path).get('sources') or {}
+    for name, source in sources.items():
+        if source.get('renderer') not in RENDERERS:
+            raise ValueError(f"Unknown renderer for source '{name}': {source.get('renderer')}")
+        if source.get('loader', 'file') not in LOADERS:
+            raise ValueError(f"Unknown loader for source '{name}': {source.get('loader')}")
+        if not source.get('path'):
+            raise ValueError(f"Source '{name}' has no path")
+        if source.get('loader') == 'publications' and not source.get('inputs'):
+            raise ValueError(f"Source '{name}' has no inputs")
+        policy = (source.get('chunking') or {}).get('policy', 'whole')
+        if policy not in CHUNKING_POLICIES:
+            raise ValueError(f"Unknown chunking policy for source '{name}': {policy}")
+        if source.get('loader') == 'json_stream':
+            if not source.get('stream') or source.get('item_renderer') not in RENDERERS:
+                raise ValueError(f"Source '{name}' needs a stream key and a known item_renderer")
+            if policy == 'split':
+                raise ValueError(f"Source '{name}' is streamed and cannot use the split policy")
+        elif source.get('loader') == 'publications' and policy == 'pack':
+            if source.get('item_renderer') not in RENDERERS:
+                raise ValueError(f"Source '{name}' uses the pack policy and needs a known item_renderer")
+        elif policy == 'pack':
+            raise ValueError(f"Source '{name}' uses the pack policy, which needs the json_stream "
+                             f"or publications loader")
+    return sources
+
+
+def chunk_text(text, chunking):
+    """Split text according to a source's chunking policy"""
+    chunking = chunking or {}
+    if chunking.get('policy', 'whole') == 'whole':
+        return [text]
+
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunking.get('chunk_size', 4000),
+        chunk_overlap=chunking.get('chunk_overlap', 200)
+    )
+    return splitter.split_text(text)
+
+
+def pack_items(header, items, chunking):
+    """Chunks of header followed by as many whole item texts as fit in chunk_size.
+
+    Items are consumed one at a time; an item too long for a chunk of its own
+    is split, and every part keeps the header.
+    """
+    chunking = chunking or {}
+    if chunking.get('policy', 'whole') == 'whole':
+        for item in items:
+            yield header + item
+        return
+
+    chunk_size = chunking.get('chunk_size', 4000)
+    current = header
+    packed = False
+    for item in items:
+        if len(header) + len(item) > chunk_size:
+            split = {**chunking, 'policy': 'split', 'chunk_size': max(chunk_size - len(header), 1)}
+            for part in chunk_text(item, split):
+                yield header + part
+            packed = True
+            continue
+        if len(current) + len(item) > chunk_size:
+            yield current
+            current = header
+        current += item
+        packed = True
+
+    if current != header or not packed:
+        yield current
+
+
+def resolve_publications(source, path):
+    records, stats = publications.resolve(source.get('inputs') or {}, path)
+    print(f"Resolved {stats['listings']} publication listings into {stats['publications']} publications "
+          f"({stats['merged']} duplicates merged, {stats['skipped']} without a title)")
+    return records
+
+
+def iter_source_texts(name, source, path):
+    """(text, metadata name) pairs of a source, before chunking"""
+    renderer = RENDERERS[source['renderer']]
+    options = source.get('options') or {}
+
+    if source.get('loader', 'file') == 'json_directory':
+        name_key = source.get('name_key', 'name')
+        for record in iter_json_directory(path):
+            yield renderer(record, **options), record.get(name_key, 'Unknown')
+    elif source.get('loader') == 'publications':
+        name_key = source.get('name_key', 'title')
+        for record in resolve_publications(source, path):
+            yield renderer(record, **options), record.get(name_key, 'Unknown')
+    else:
+        yield renderer(path, **options), source.get('name', name)
+
+
+def iter_source_documents(name, source):
+    """Render a registry source into documents, lazily"""
+    from langchain.schema import Document
+
+    path = os.path.join(ROOT_DIR, source['path'])
+    if not os.path.exists(path):
+        print(f"Skipping {name}: {source['path']} not found")
+        return
+
+    if source.get('loader') == 'json_stream':
+        # Large files: the items of the streamed array are rendered and
+        # packed into chunks one at a time
+        renderer = RENDERERS[source['renderer']]
+        item_renderer = RENDERERS[source['item_renderer']]
+        name_key = source.get('name_key', 'name')
+        for header, items in iter_json_stream(path, source['stream']):
+            texts = (item_renderer(item) for item in items)
+            for chunk in pack_items(renderer(header), texts, source.get('chunking')):
+                yield Document(page_content=chunk, metadata={"name": header.get(name_key, 'Unknown'), "source": name})
+        return
+
+    if source.get('loader') == 'publications' and (source.get('chunking') or {}).get('policy') == 'pack':
+        # Canonical records packed into chunks per faculty member, so each
+        # publication is embedded once without a vector of its own
+        renderer = RENDERERS[source['renderer']]
+        item_renderer = RENDERERS[source['item_renderer']]
+        for faculty, records in publications.group_by_faculty(resolve_publications(source, path)):
+            texts = (item_renderer(record) for record in records)
+            for chunk in pack_items(renderer(faculty), texts, source.get('chunking')):
+                yield Document(page_content=chunk, metadata={"name": faculty or source.get('name', name),
+                                                             "source": name})
+        return
+
+    for text, doc_name in iter_source_texts(name, source, path):
+        for chunk in chunk_text(text, source.get('chunking')):
+            yield Document(page_content=chunk, metadata={"name": doc_name, "source": name})
+
+
+def create_source_documents(name, source):
+    """Render a registry source into documents"""
+    return list(iter_source_documents(name, source))
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def cache_path(name):
+    return os.path.join(CACHE_DIR, f"{name}.json")
+
+
+def read_source_cache(name):
+    try:
+        with open(cache_path(name), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def build_source(name, source):
+    """Render and embed one source, caching its documents and vectors"""
+    import embedding_backends
+
+    embeddings = get_embeddings()
+
+    # The cache is written as the batches are embedded, in the same shape as
+    # json.dump of {"source", "embeddings", "documents"}
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = cache_path(name) + ".tmp"
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(f'{{"source": {json.dumps(source)}, '
+                   f'"embeddings": {json.dumps(embedding_backends.describe(embeddings))}, "documents": [')
+        for batch in batches(iter_source_documents(name, source), EMBED_BATCH_SIZE):
+            vectors = embeddings.embed_documents([doc.page_content for doc in batch])
+            for doc, vector in zip(batch, vectors):
+                entry = {"page_content": doc.page_content, "metadata": doc.metadata, "embedding": vector}
+                file.write((", " if count else "") + json.dumps(entry))
+                count += 1
+        file.write("]}")
+    os.replace(tmp_path, cache_path(name))
+
+    print(f"Loaded {name}: {count} documents")
+    return count
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process so far"""
+    try:
+        import resource
+    except ImportError:
+        return float('nan')
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def build(selected=None, workers=4, sources_path=SOURCES_PATH, quantization_type="flat", dimensions=None):
+    """Build the selected sources (all by default) and rebuild the FAISS index.
+
+    Sources that are not selected are taken from the build cache, unless they
+    have never been built or their registry entry changed since.
+    """
+    import index_store
+    import embedding_backends
+    import faq
+
+    embeddings = get_embeddings()
+    sources = load_sources(sources_path)
+    selected = list(selected or sources)
+    unknown = [name for name in selected if name not in sources]
+    if unknown:
+        raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+
+    faq_config = load_registry(sources_path).get('faq')
+    faq_cache_path = os.path.join(CACHE_DIR, "faq.json")
+    faq_stale = faq.stale_sources(faq_config, faq_cache_path)
+    for name, source in sources.items():
+        if name in selected:
+            continue
+        cached = read_source_cache(name)
+        if (cached is None or cached.get('source') != source
+                or cached.get('embeddings') != embedding_backends.describe(embeddings)):
+            print(f"Cache for {name} is missing or stale, rebuilding it")
+            selected.append(name)
+        elif name in faq_stale:
+            print(f"FAQ cache for {name} is missing or stale, rebuilding it")
+            selected.append(name)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(lambda name: build_source(name, sources[name]), selected))
+
+    texts = []
+    metadatas = []
+    vectors = []
+    for name in sources:
+        for entry in read_source_cache(name)['documents']:
+            texts.append(entry['page_content'])
+            metadatas.append(entry['metadata'])
+            vectors.append(entry['embedding'])
+
+    print(f"Created {len(texts)} documents")
+    if not texts:
+        raise ValueError("No documents to index")
+
+    # Canonical answers for the most frequent questions, published with the
+    # index; sections of sources taken from the cache are too
+    faq_entries = faq.build_faq(faq_config, ROOT_DIR, faq_cache_path, rebuilt_sources=selected)
+
+    previous = index_store.current_version(INDEX_DIR)
+
+    # Create and publish the FAISS index; running chat workers pick it up
+    version = index_store.publish_index(
+        INDEX_DIR, texts, metadatas, vectors,
+        embedding_model=embeddings.model,
+        embedding_backend=embedding_backends.describe(embeddings)["backend"],
+        sources=list(sources),
+        quantization_type=quantization_type,
+        dimensions=dimensions,
+        faq=faq_entries
+    )
+
+    print(f"FAISS index {version} created and published successfully.")
+    if previous:
+        before = index_store.read_manifest(INDEX_DIR, previous)
+        after = index_store.read_manifest(INDEX_DIR, version)
+        print(f"Compared with {previous}: {before['document_count']} -> {after['document_count']} documents, "
+              f"index {before.get('index_bytes', 0):,} -> {after['index_bytes']:,} bytes")
+    print(f"Peak memory: {peak_memory_mb():.0f} MB")
+    return version
+
+def main():
+    import index_store
+    import quantization
+
+    parser = argparse.ArgumentParser(description="Build the ChatAMCS FAISS index from sources.yaml")
+    parser.add_argument("sources", nargs="*", help="sources to rebuild (default: all)")
+    parser.add_argument("--workers", type=int, default=4, help="number of sources built in parallel")
+    parser.add_argument("--config", default=SOURCES_PATH, help="path to the source registry")
+    parser.add_argument("--list", action="store_true", help="list the registered sources and exit")
+    parser.add_argument("--versions", action="store_true", help="list the published index versions and exit")
+    parser.add_argument("--rollback", nargs="?", const="previous", metavar="VERSION",
+                        help="make VERSION (default: the previous one) current and exit")
+    parser.add_argument("--quantization", choices=quantization.QUANTIZATIONS, default="flat",
+                        help="how vectors are stored in the index (see quantization.py)")
+    parser.add_argument("--dimensions", type=int,
+                        help="truncate embeddings to this many dimensions (Matryoshka models only)")
+    parser.add_argument("--keep", type=int, help="after building, remove all but the newest KEEP versions")
+    parser.add_argument("--import-legacy", metavar="DIR",
+                        help="publish an index saved with FAISS.save_local as a new version and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name, source in load_sources(args.config).items():
+            print(f"{name}: {source['path']} ({source['renderer']})")
+        return
+
+    if args.versions:
+        current = index_store.current_version(INDEX_DIR)
+        for version in index_store.list_versions(INDEX_DIR):
+            manifest = index_store.read_manifest(INDEX_DIR, version)
+            marker = "*" if version == current else " "
+            print(f"{marker} {version}: {manifest['document_count']} documents, "
+                  f"{manifest.get('embedding_backend', 'openai')}/{manifest['embedding_model']} "
+                  f"({manifest['dimension']}d), "
+                  f"{manifest.get('quantization', 'flat')} {manifest.get('index_dimension', manifest['dimension'])}d")
+        return
+
+    if args.rollback:
+        version = index_store.rollback(INDEX_DIR, None if args.rollback == "previous" else args.rollback)
+        print(f"Current index version is now {version}")
+        return
+
+    if args.import_legacy:
+        version = index_store.import_legacy_index(INDEX_DIR, args.import_legacy, get_embeddings())
+        print(f"Imported {args.import_legacy} as index version {version}")
+        return
+
+    build(args.sources, workers=args.workers, sources_path=args.config,
+          quantization_type=args.quantization, dimensions=args.dimensions)
+
+    if args.keep:
+        for version in index_store.prune_versions(INDEX_DIR, args.keep):
+            print(f"Removed index version {version}")
+
+
+if __name__ == "__main__":
+    main()
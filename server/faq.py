@@ -0,0 +1,346 @@
+import os
+import re
+import json
+import math
+import hashlib
+from collections import defaultdict
+import jsonstream
+
+# Canonical question/answer pairs for the questions students ask most: the HOD,
+# the director, program coordinators, lab locations and course credits.
+# They are generated from the same data files as the index at build time and
+# published with it (faq.json in the index version), so a matching question is
+# answered without calling the LLM and always agrees with the indexed data.
+#
+# A section of the faq config that names the `source` indexing its file is
+# only regenerated when that source is rebuilt; otherwise its pairs come from
+# the build cache, like the source's documents. Within a section each entity
+# (a program, a lab, a course, ...) is hashed, and only entities whose data
+# changed are regenerated.
+
+FAQ_MATCH_THRESHOLD = float(os.getenv("FAQ_MATCH_THRESHOLD", "0.8"))
+
+# Bumped when the generated pairs change shape, which invalidates the cache
+CACHE_FORMAT = 2
+
+# Words that do not change what is being asked
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "of", "for", "in", "at", "to", "on", "and", "please", "tell", "me",
+    "do", "does", "can", "you", "i", "know", "dr", "mr", "mrs", "ms",
+    "department", "dept", "amcs", "program", "programme", "course",
+}
+
+# Phrases rewritten to one spelling before matching
+SYNONYMS = [
+    (r"(\w)'s\b", r"\1"),
+    (r"\bhod\b", "head"),
+    (r"\bheads\b", "head"),
+    (r"\bco-?ordinat(?:or|es|ing)\b", "coordinator"),
+    (r"\bin-?charge\b", "charge"),
+    (r"\bincharge\b", "charge"),
+    (r"\blocated\b|\blocation\b", "where"),
+    (r"\blaboratory\b|\blabs\b", "lab"),
+    (r"\bcredit\b", "credits"),
+    (r"\b([mb])\.?\s?sc\b", r"\1sc"),
+]
+
+
+def normalize(question):
+    """Lower-cased content words of a question, with synonyms folded together"""
+    text = question.lower()
+    for pattern, replacement in SYNONYMS:
+        text = re.sub(pattern, replacement, text)
+    return [token for token in re.findall(r"[\w'-]+", text.replace(".", " ")) if token not in STOPWORDS]
+
+
+def record_hash(record):
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def pair(questions, answer, source, subject=None):
+    """A question/answer pair; a near duplicate must name every word of `subject`"""
+    return {"questions": questions, "answer": answer, "source": source, "subject": subject}
+
+
+def department_pairs(department):
+    name = department.get('name', 'the department')
+    pairs = []
+    if department.get('hod'):
+        pairs.append(pair(
+            ["Who is the head of the department?", "Who is the HOD?", "Who is the HOD of AMCS?",
+             "Who heads the department?"],
+            f"The head of the Department of {name} is {department['hod']}.",
+            "Department"
+        ))
+    if department.get('director'):
+        pairs.append(pair(
+            ["Who is the director of the department?", "Who is the director?", "Who is the director of AMCS?"],
+            f"The director of the Department of {name} is {department['director']}.",
+            "Department"
+        ))
+    return pairs
+
+
+def coordinator_pairs(program, details):
+    coordinator = details.get('Program Co-ordinator')
+    if not coordinator:
+        return []
+    return [pair(
+        [f"Who is the program coordinator of {program}?", f"Who is the coordinator of {program}?",
+         f"Who coordinates {program}?", f"Who is the {program} coordinator?"],
+        f"The program coordinator of {program} is {coordinator}.",
+        program,
+        subject=program
+    )]
+
+
+def lab_pairs(lab, details):
+    pairs = []
+    if details.get('Location'):
+        pairs.append(pair(
+            [f"Where is the {lab}?", f"Where is the {lab} located?", f"What is the location of the {lab}?"],
+            f"The {lab} is located at {details['Location']}.",
+            "Laboratory Facilities",
+            subject=lab
+        ))
+    if details.get('Staff incharge'):
+        pairs.append(pair(
+            [f"Who is in charge of the {lab}?", f"Who is the staff in-charge of the {lab}?",
+             f"Which faculty member is in charge of the {lab}?"],
+            f"The staff in-charge of the {lab} is {details['Staff incharge']}.",
+            "Laboratory Facilities",
+            subject=lab
+        ))
+    return pairs
+
+
+def course_pairs(course, program, year, unique_title, unique_code):
+    """Credit questions for one course; credits are 'L T P C' in the regulation files"""
+    parts = str(course.get('credits') or '').split()
+    if len(parts) != 4 or not all(part.isdigit() for part in parts):
+        return []
+
+    title = course.get('title', '').strip()
+    code = course.get('code')
+    name = f"{title.title()} ({code})" if code else title.title()
+    answer = (f"{name} in the {program} {year} regulations carries {parts[3]} credits "
+              f"(lecture-tutorial-practical-credits: {'-'.join(parts)}).")
+
+    questions = [f"How many credits is {title} in {program} {year}?",
+                 f"What are the credits for {title} in {program} {year}?"]
+    if unique_title:
+        questions += [f"How many credits is {title}?", f"What are the credits for {title}?"]
+    if code and unique_code:
+        questions += [f"How many credits is {code}?", f"What are the credits for {code}?"]
+    return [pair(questions, answer, program, subject=title)]
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def department_entities(path):
+    department = load_json(path)
+    yield "department", department, lambda: department_pairs(department)
+
+
+def coordinator_entities(path):
+    for program, details in load_json(path).items():
+        yield f"coordinator:{program}", details, lambda p=program, d=details: coordinator_pairs(p, d)
+
+
+def lab_entities(path):
+    for lab, details in load_json(path).items():
+        yield f"lab:{lab}", details, lambda l=lab, d=details: lab_pairs(l, d)
+
+
+def course_entities(directory):
+    courses = []
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            # Regulation files are streamed; only the fields the pairs use are kept
+            path = os.path.join(directory, filename)
+            regulation = jsonstream.read_header(path, ("courses",))
+            for course in jsonstream.iter_items(path, "courses"):
+                course = {field: course[field] for field in ("code", "title", "credits") if field in course}
+                courses.append((regulation.get('program_name'), regulation.get('year'), course))
+
+    # Unqualified questions are only generated when they name one course
+    # ("Web Engineering Lab" and "Web Engineering Laboratory" name the same)
+    titles = defaultdict(int)
+    codes = defaultdict(int)
+    for _, _, course in courses:
+        titles[" ".join(normalize(course.get('title', '')))] += 1
+        codes[course.get('code')] += 1
+
+    seen = defaultdict(int)
+    for program, year, course in courses:
+        record = {"program": program, "year": year, "course": course,
+                  "unique_title": titles[" ".join(normalize(course.get('title', '')))] == 1,
+                  "unique_code": codes[course.get('code')] == 1}
+        # Some regulations list the same code twice; number the repeats
+        entity = f"course:{program}:{year}:{course.get('code')}:{course.get('title')}"
+        seen[entity] += 1
+        if seen[entity] > 1:
+            entity += f":{seen[entity]}"
+        yield (entity, record,
+               lambda r=record: course_pairs(r["course"], r["program"], r["year"],
+                                             r["unique_title"], r["unique_code"]))
+
+
+# Sections of the faq config and the entities generated from their files
+SECTIONS = {
+    "department": department_entities,
+    "coordinators": coordinator_entities,
+    "labs": lab_entities,
+    "courses": course_entities,
+}
+
+
+def section_config(config, section):
+    """{"path": ..., "source": ...} of a faq section, or None; a plain string is the path"""
+    value = (config or {}).get(section)
+    if not value:
+        return None
+    return {"path": value} if isinstance(value, str) else dict(value)
+
+
+def read_cache(cache_path):
+    """Cached sections as {section: {"config", "entries"}}, empty if the cache is missing or outdated"""
+    try:
+        cache = load_json(cache_path)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("format") != CACHE_FORMAT:
+        return {}
+    return cache["sections"]
+
+
+def stale_sources(config, cache_path):
+    """Sources whose faq section has no usable cache, and must be rebuilt to regenerate it"""
+    cache = read_cache(cache_path)
+    sources = []
+    for section in SECTIONS:
+        settings = section_config(config, section)
+        if settings and settings.get("source"):
+            cached = cache.get(section)
+            if cached is None or cached["config"] != settings:
+                sources.append(settings["source"])
+    return sources
+
+
+def build_faq(config, root_dir, cache_path, rebuilt_sources=None):
+    """Generate the FAQ entries.
+
+    A section tied to a source that is not in rebuilt_sources keeps its cached
+    entries, so it describes the same data as the source's cached documents.
+    Other sections are regenerated, reusing the cached pairs of entities whose
+    data did not change.
+    """
+    cache = read_cache(cache_path)
+    sections = {}
+    regenerated = reused = 0
+    for section, entities in SECTIONS.items():
+        settings = section_config(config, section)
+        if settings is None:
+            continue
+        cached = cache.get(section)
+        if cached is not None and cached["config"] != settings:
+            cached = None
+        if (cached is not None and settings.get("source")
+                and rebuilt_sources is not None and settings["source"] not in rebuilt_sources):
+            sections[section] = cached
+            reused += len(cached["entries"])
+            continue
+
+        previous = {entry["entity"]: entry for entry in cached["entries"]} if cached else {}
+        entries = []
+        for entity, record, generate in entities(os.path.join(root_dir, settings["path"])):
+            digest = record_hash(record)
+            entry = previous.get(entity)
+            if entry is None or entry["hash"] != digest:
+                entry = {"entity": entity, "hash": digest, "pairs": generate()}
+                regenerated += 1
+            else:
+                reused += 1
+            entries.append(entry)
+        sections[section] = {"config": settings, "entries": entries}
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with open(cache_path, 'w', encoding='utf-8') as file:
+        json.dump({"format": CACHE_FORMAT, "sections": sections}, file)
+
+    entries = [entry for section in sections.values() for entry in section["entries"]]
+    print(f"FAQ: {len(entries)} entities, {regenerated} regenerated, {reused} unchanged")
+    return entries
+
+
+class FaqStore:
+    """Looks up a question among the canonical FAQ questions, exactly or as a near duplicate"""
+
+    def __init__(self, entries, threshold=FAQ_MATCH_THRESHOLD):
+        self.threshold = threshold
+        self.exact = defaultdict(list)
+        self.questions = []
+        self.by_token = defaultdict(set)
+        # Words that name some subject (a course, a lab, a program)
+        self.subject_words = set()
+        for entry in entries:
+            for qa in entry["pairs"]:
+                subject = frozenset(normalize(qa.get("subject") or ""))
+                self.subject_words |= subject
+                for question in qa["questions"]:
+                    tokens = normalize(question)
+                    key = " ".join(tokens)
+                    if qa not in self.exact[key]:
+                        self.exact[key].append(qa)
+                    for token in tokens:
+                        self.by_token[token].add(len(self.questions))
+                    self.questions.append((frozenset(tokens), subject, qa))
+
+    def __len__(self):
+        return len(self.questions)
+
+    def match(self, question):
+        """The matching {"questions", "answer", "source"} pair, or None"""
+        tokens = normalize(question)
+        if not tokens:
+            return None
+        # Questions of different entities can normalize alike; those are
+        # ambiguous and fall through
+        found = self.exact.get(" ".join(tokens), [])
+        if found and len({qa["answer"] for qa in found}) == 1:
+            return found[0]
+
+        # Near duplicates: token-set Jaccard similarity, with numbers (years,
+        # credits, course codes) matching exactly. A question with Jaccard >=
+        # threshold shares at least one of the rarest len - ceil(threshold * len) + 1
+        # words, so only questions containing one of those are compared.
+        asked = frozenset(tokens)
+        numbers = {token for token in asked if any(ch.isdigit() for ch in token)}
+        rarest = sorted(asked, key=lambda token: len(self.by_token.get(token, ())))
+        positions = set()
+        for token in rarest[:len(asked) - math.ceil(self.threshold * len(asked)) + 1]:
+            positions |= self.by_token.get(token, set())
+
+        best_score, best = 0.0, []
+        for position in positions:
+            candidate, subject, qa = self.questions[position]
+            if numbers != {token for token in candidate if any(ch.isdigit() for ch in token)}:
+                continue
+            # The question must name the subject, all of it and nothing else:
+            # "machine learning" is not "adversarial machine learning", and
+            # "data structures lab" is not "data structures"
+            if subject and (not subject <= asked or (asked - candidate) & self.subject_words):
+                continue
+            score = len(asked & candidate) / len(asked | candidate)
+            if score > best_score:
+                best_score, best = score, [qa]
+            elif score == best_score and qa not in best:
+                best.append(qa)
+
+        # An ambiguous match is left to the LLM
+        if best_score >= self.threshold and len({qa["answer"] for qa in best}) == 1:
+            return best[0]
+        return None
@@ -0,0 +1,60 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+# Cold-start budget for the server modules. Each module is imported in a fresh
+# interpreter under `python -X importtime` and its cumulative import time is
+# compared with the budget, so a heavy dependency creeping back to module
+# level (langchain, FAISS, numpy, API clients) fails the check.
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+MODULES = ("chat", "embeddings", "serve")
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "150"))
+
+LINE_PATTERN = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure(module):
+    """Cumulative import time of module in milliseconds and the five slowest imports of the run"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    cumulative = None
+    imports = []
+    for line in result.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        imports.append((int(self_us) / 1000, name))
+        # The module itself is the outermost entry with its name
+        if name == module and len(indent) == 1:
+            cumulative = int(cumulative_us) / 1000
+    return cumulative, sorted(imports, reverse=True)[:5]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of the server modules against a budget")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="budget per module in milliseconds")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        cumulative, slowest = measure(module)
+        status = "ok" if cumulative <= args.budget else "OVER BUDGET"
+        over_budget = over_budget or cumulative > args.budget
+        print(f"{module}: {cumulative:.1f} ms (budget {args.budget:.0f} ms) {status}")
+        for milliseconds, name in slowest:
+            print(f"    {milliseconds:8.1f} ms  {name}")
+
+    sys.exit(1 if over_budget else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,339 @@
+import os
+import json
+import shutil
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_community.docstore.base import Docstore
+from langchain.schema import Document
+import quantization
+import embedding_backends
+
+# An index directory holds every published build:
+#   versions/<version>/index.npy        float32 vectors of a flat index, searched
+#                                       through a memory map (see MappedFlatIndex)
+#   versions/<version>/index.faiss      a compressed index, read into memory
+#   versions/<version>/docstore.sqlite  the documents, opened read-only
+#   versions/<version>/vectors.npy      full-precision vectors, only for compressed
+#                                       indexes (see quantization.py)
+#   versions/<version>/faq.json         canonical question/answer pairs (see faq.py)
+#   versions/<version>/manifest.json    document count, model, dimension, checksums
+#   CURRENT                             the version readers should use
+# A build is written to a staging directory, renamed into versions/ and only
+# then is CURRENT replaced, so readers never see a half-written index.
+# Old versions are kept so that rolling back is just moving CURRENT.
+VERSIONS_DIR = "versions"
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+INDEX_MATRIX_FILE = "index.npy"
+DOCSTORE_FILE = "docstore.sqlite"
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+FAQ_FILE = "faq.json"
+
+
+def version_dir(directory, version):
+    return os.path.join(directory, VERSIONS_DIR, version)
+
+
+class SqliteDocstore(Docstore):
+    """Read-only docstore backed by a SQLite file shared between processes"""
+
+    def __init__(self, path):
+        self.path = path
+        # One connection per process, shared by its request threads (the
+        # server starts a thread per HTTP connection, so per-thread
+        # connections were opened and dropped on every request)
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+
+    def search(self, search):
+        with self._lock:
+            # A connection must not cross a fork
+            if self._connection is None or self._pid != os.getpid():
+                self._connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+                self._pid = os.getpid()
+            row = self._connection.execute(
+                "SELECT page_content, metadata FROM documents WHERE id = ?", (int(search),)
+            ).fetchone()
+        if row is None:
+            return f"ID {search} not found."
+        return Document(page_content=row[0], metadata=json.loads(row[1]))
+
+
+class MappedFlatIndex:
+    """Exact L2 search over a memory-mapped float32 matrix.
+
+    faiss reads an IndexFlat into private memory whatever the IO flags (it only
+    memory-maps IVF inverted lists), so every worker held its own copy of the
+    index. Searching the .npy file through a memory map leaves the vectors in
+    the page cache, shared by all workers and by every reload of a version.
+    Implements the part of the faiss.Index interface the FAISS vectorstore uses.
+    """
+
+    # Rows multiplied at once, bounding the temporary memory of a search
+    BLOCK_ROWS = 8192
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.ntotal, self.d = vectors.shape
+
+    def search(self, queries, k):
+        queries = np.ascontiguousarray(queries, dtype='float32').reshape(-1, self.d)
+        query_norms = np.einsum('ij,ij->i', queries, queries)[:, None]
+        distances = np.full((len(queries), k), np.inf, dtype='float32')
+        ids = np.full((len(queries), k), -1, dtype='int64')
+
+        for start in range(0, self.ntotal, self.BLOCK_ROWS):
+            block = self.vectors[start:start + self.BLOCK_ROWS]
+            block_distances = query_norms - 2 * (queries @ block.T) + np.einsum('ij,ij->i', block, block)[None, :]
+            block_ids = np.broadcast_to(np.arange(start, start + len(block), dtype='int64'), block_distances.shape)
+            candidates = np.concatenate([distances, np.maximum(block_distances, 0)], axis=1)
+            candidate_ids = np.concatenate([ids, block_ids], axis=1)
+            best = np.argpartition(candidates, k - 1, axis=1)[:, :k]
+            distances = np.take_along_axis(candidates, best, axis=1)
+            ids = np.take_along_axis(candidate_ids, best, axis=1)
+
+        order = np.argsort(distances, axis=1)
+        distances = np.take_along_axis(distances, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+        ids[np.isinf(distances)] = -1
+        return distances, ids
+
+    def reconstruct(self, i):
+        return np.array(self.vectors[int(i)], dtype='float32')
+
+
+def write_docstore(path, texts, metadatas):
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("CREATE TABLE documents (id INTEGER PRIMARY KEY, page_content TEXT, metadata TEXT)")
+        connection.executemany(
+            "INSERT INTO documents VALUES (?, ?, ?)",
+            ((i, text, json.dumps(metadata)) for i, (text, metadata) in enumerate(zip(texts, metadatas)))
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def file_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(directory, version):
+    with open(os.path.join(version_dir(directory, version), MANIFEST_FILE), 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def current_version(directory):
+    """Return the published version in directory, or None if nothing is published"""
+    try:
+        with open(os.path.join(directory, CURRENT_FILE), 'r', encoding='utf-8') as file:
+            return file.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(directory):
+    """Return the published versions, oldest first"""
+    try:
+        names = os.listdir(os.path.join(directory, VERSIONS_DIR))
+    except FileNotFoundError:
+        return []
+    return sorted(
+        name for name in names
+        if not name.startswith(".") and os.path.exists(os.path.join(version_dir(directory, name), MANIFEST_FILE))
+    )
+
+
+def set_current(directory, version):
+    """Atomically point CURRENT at an existing version"""
+    if version not in list_versions(directory):
+        raise ValueError(f"Unknown index version: {version}")
+
+    tmp_path = os.path.join(directory, CURRENT_FILE + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(version)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, os.path.join(directory, CURRENT_FILE))
+
+
+def rollback(directory, version=None):
+    """Point CURRENT at version, or at the version published before the current one"""
+    if version is None:
+        versions = list_versions(directory)
+        current = current_version(directory)
+        older = [v for v in versions if current is None or v < current]
+        if not older:
+            raise ValueError("No older index version to roll back to")
+        version = older[-1]
+    set_current(directory, version)
+    return version
+
+
+def prune_versions(directory, keep):
+    """Remove all but the newest `keep` versions, never removing the current one"""
+    current = current_version(directory)
+    versions = list_versions(directory)
+    removed = []
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version != current:
+            shutil.rmtree(version_dir(directory, version))
+            removed.append(version)
+    return removed
+
+
+def publish_index(directory, texts, metadatas, vectors, embedding_model=None, sources=None,
+                  quantization_type="flat", dimensions=None, embedding_backend="openai", faq=None):
+    """Write a new version with its manifest and atomically make it the current one"""
+    matrix = np.asarray(vectors, dtype='float32')
+    dimensions = quantization.check_dimensions(embedding_model, matrix.shape[1], dimensions)
+    searched = quantization.truncate(matrix, dimensions)
+
+    version = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+    staging_dir = os.path.join(directory, VERSIONS_DIR, f".{version}.tmp")
+    os.makedirs(staging_dir)
+
+    if quantization_type == "flat":
+        # Searched in place through a memory map; see MappedFlatIndex
+        filenames = [INDEX_MATRIX_FILE, DOCSTORE_FILE]
+        np.save(os.path.join(staging_dir, INDEX_MATRIX_FILE), searched)
+        index_size = int(searched.nbytes)
+    else:
+        filenames = [INDEX_FILE, DOCSTORE_FILE]
+        index = quantization.make_index(searched, quantization_type)
+        faiss.write_index(index, os.path.join(staging_dir, INDEX_FILE))
+        index_size = quantization.index_bytes(index)
+    write_docstore(os.path.join(staging_dir, DOCSTORE_FILE), texts, metadatas)
+    if quantization_type != "flat" or dimensions:
+        np.save(os.path.join(staging_dir, VECTORS_FILE), matrix)
+        filenames.append(VECTORS_FILE)
+    if faq is not None:
+        with open(os.path.join(staging_dir, FAQ_FILE), 'w', encoding='utf-8') as file:
+            json.dump(faq, file)
+        filenames.append(FAQ_FILE)
+
+    manifest = {
+        "version": version,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "document_count": len(texts),
+        "embedding_backend": embedding_backend,
+        "embedding_model": embedding_model,
+        "dimension": int(matrix.shape[1]),
+        "index_dimension": int(searched.shape[1]),
+        "quantization": quantization_type,
+        "index_bytes": index_size,
+        "sources": sources or [],
+        "checksums": {filename: file_checksum(os.path.join(staging_dir, filename)) for filename in filenames}
+    }
+    with open(os.path.join(staging_dir, MANIFEST_FILE), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=4)
+
+    os.rename(staging_dir, version_dir(directory, version))
+    set_current(directory, version)
+    return version
+
+
+def load_index(directory, embeddings, version=None):
+    """Load a published version (the current one by default) as a FAISS vectorstore.
+
+    The files are checked against the manifest before they are used, so a
+    corrupted build is rejected instead of being served.
+    """
+    version = version or current_version(directory)
+    if version is None:
+        raise FileNotFoundError(f"No index published in {directory}")
+
+    path = version_dir(directory, version)
+    manifest = read_manifest(directory, version)
+
+    # Query vectors from another model would silently return nonsense
+    built_with = {"backend": manifest.get("embedding_backend", "openai"), "model": manifest["embedding_model"]}
+    query_with = embedding_backends.describe(embeddings)
+    if built_with != query_with:
+        raise ValueError(f"Index version {version} was built with {built_with['backend']}/{built_with['model']} "
+                         f"embeddings but is queried with {query_with['backend']}/{query_with['model']}")
+
+    for filename, checksum in manifest["checksums"].items():
+        if file_checksum(os.path.join(path, filename)) != checksum:
+            raise ValueError(f"Checksum mismatch for {filename} in index version {version}")
+
+    if INDEX_MATRIX_FILE in manifest["checksums"]:
+        index = MappedFlatIndex(np.load(os.path.join(path, INDEX_MATRIX_FILE), mmap_mode='r'))
+    else:
+        # Compressed indexes, and flat ones published before index.npy, are
+        # read into the memory of each worker
+        index = faiss.read_index(os.path.join(path, INDEX_FILE))
+    index_dimension = manifest.get("index_dimension", manifest["dimension"])
+    if index.ntotal != manifest["document_count"] or index.d != index_dimension:
+        raise ValueError(f"Index version {version} does not match its manifest")
+
+    arguments = dict(
+        embedding_function=embeddings,
+        index=index,
+        docstore=SqliteDocstore(os.path.join(path, DOCSTORE_FILE)),
+        index_to_docstore_id={i: str(i) for i in range(index.ntotal)}
+    )
+    if VECTORS_FILE in manifest["checksums"]:
+        # Compressed index: re-score candidates against the full vectors, left on disk
+        vectorstore = quantization.RescoringFAISS(
+            full_vectors=np.load(os.path.join(path, VECTORS_FILE), mmap_mode='r'),
+            dimensions=index_dimension if index_dimension != manifest["dimension"] else None,
+            **arguments
+        )
+    else:
+        vectorstore = FAISS(**arguments)
+    return version, vectorstore
+
+
+def load_faq(directory, version):
+    """FAQ entries published with a version, or an empty list for versions built without them"""
+    try:
+        with open(os.path.join(version_dir(directory, version), FAQ_FILE), 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return []
+
+
+def import_legacy_index(directory, legacy_dir, embeddings):
+    """Publish an index saved with FAISS.save_local (e.g. server/server/faiss_index) as a new version"""
+    legacy = FAISS.load_local(legacy_dir, embeddings, allow_dangerous_deserialization=True)
+    documents = [legacy.docstore.search(legacy.index_to_docstore_id[i]) for i in range(legacy.index.ntotal)]
+    vectors = legacy.index.reconstruct_n(0, legacy.index.ntotal)
+    return publish_index(
+        directory,
+        [doc.page_content for doc in documents],
+        [doc.metadata for doc in documents],
+        vectors,
+        embedding_model=embeddings.model,
+        embedding_backend=embedding_backends.describe(embeddings)["backend"],
+        sources=["legacy"]
+    )
+
+
+def search_batch(vectorstore, vectors, k):
+    """Search many query vectors in one FAISS call; returns a list of (document, distance) lists per query"""
+    queries = np.asarray(vectors, dtype='float32')
+    if isinstance(vectorstore, quantization.RescoringFAISS):
+        _, indices = vectorstore.index.search(
+            quantization.truncate(queries, vectorstore.dimensions), k * vectorstore.rescore_factor
+        )
+        hits = [quantization.rescore(vectorstore.full_vectors, query, ids, k) for query, ids in zip(queries, indices)]
+    else:
+        distances, indices = vectorstore.index.search(queries, k)
+        hits = [[(int(i), float(distance)) for i, distance in zip(ids, row) if i != -1]
+                for ids, row in zip(indices, distances)]
+
+    return [[(vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]), distance) for i, distance in row]
+            for row in hits]
@@ -0,0 +1,115 @@
+import json
+
+# Incremental reading of large JSON files. A regulation file is one object
+# whose `courses` array holds almost all of its bytes; iter_members() walks the
+# top-level object and hands out the elements of such arrays one at a time,
+# so only one course (plus a read buffer) is in memory at once.
+
+BUFFER_SIZE = 64 * 1024
+WHITESPACE = " \t\n\r"
+NUMBER_START = "-0123456789"
+NUMBER_CHARS = "-+.eE0123456789"
+
+_decoder = json.JSONDecoder()
+
+
+class _Reader:
+    def __init__(self, file, buffer_size):
+        self.file = file
+        self.buffer_size = buffer_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        """Read more of the file into the buffer; False at the end of the file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(self.buffer_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character, without consuming it ('' at the end)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self.fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value"""
+        first = self.peek()
+        if first and first in NUMBER_START:
+            # A number cut off by the end of the buffer would decode as a shorter one
+            while self.number_end() == len(self.buffer) and self.fill():
+                pass
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+    def number_end(self):
+        end = self.pos
+        while end < len(self.buffer) and self.buffer[end] in NUMBER_CHARS:
+            end += 1
+        return end
+
+
+def iter_members(path, streamed=(), buffer_size=BUFFER_SIZE):
+    """Walk the top-level object of a JSON file.
+
+    Yields ("member", key, value) for every member, except that arrays whose
+    key is in `streamed` yield ("item", key, element) for each element instead.
+    """
+    with open(path, 'r', encoding='utf-8') as file:
+        reader = _Reader(file, buffer_size)
+        reader.expect("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            key = reader.value()
+            reader.expect(":")
+            if key in streamed and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield "item", key, reader.value()
+                        if reader.peek() == "]":
+                            reader.pos += 1
+                            break
+                        reader.expect(",")
+            else:
+                yield "member", key, reader.value()
+
+            if reader.peek() == "}":
+                return
+            reader.expect(",")
+
+
+def read_header(path, streamed):
+    """Top-level members of a JSON file other than the streamed arrays"""
+    return {key: value for event, key, value in iter_members(path, streamed) if event == "member"}
+
+
+def iter_items(path, key):
+    """Elements of the top-level array member `key`, one at a time"""
+    for event, _, value in iter_members(path, (key,)):
+        if event == "item":
+            yield value
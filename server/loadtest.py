@@ -0,0 +1,446 @@
+import os
+import sys
+import json
+import time
+import base64
+import random
+import struct
+import hashlib
+import argparse
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Load generator for the chat service, simulating many students at once.
+#
+# Students run sessions: a question from questions.txt, or a multi-turn
+# conversation from sessions.jsonl where every turn carries the previous
+# turns as chat_history. Sessions arrive as a Poisson process at --rate per
+# second (open loop), or --concurrency students run them back to back
+# (closed loop, --rate 0). Requests go to a running serve.py (--target URL)
+# or straight to chat.answer_query in this process (--target inprocess).
+#
+# To measure the service rather than OpenAI, start the stub API, which
+# answers chat completions and embeddings with injected latency:
+#
+#   python server/loadtest.py stub --port 8100 --llm-latency 0.8 --embedding-latency 0.05
+#   OPENAI_BASE_URL=http://localhost:8100/v1 OPENAI_API_KEY=stub python server/serve.py
+#   python server/loadtest.py run --target http://localhost:8000 --rate 5 --duration 120
+#
+# Every --interval seconds throughput, latency percentiles, errors and the
+# memory of the server (or of this process) are reported, so growth in
+# session memory or caches shows up as a trend.
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+QUESTIONS_PATH = os.path.join(SERVER_DIR, "questions.txt")
+SESSIONS_PATH = os.path.join(SERVER_DIR, "sessions.jsonl")
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sorted list"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def latency_summary(latencies):
+    latencies = sorted(latencies)
+    return {
+        "p50_ms": round(percentile(latencies, 0.50), 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 0.95), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 0.99), 1) if latencies else None,
+    }
+
+
+def load_sessions(questions_path=QUESTIONS_PATH, sessions_path=SESSIONS_PATH):
+    """Single questions and multi-turn sessions, each a list of questions"""
+    import batch
+
+    sessions = [[question] for _, question in batch.load_batch(questions_path)] if questions_path else []
+    if sessions_path and os.path.exists(sessions_path):
+        with open(sessions_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    sessions.append(json.loads(line)["session"])
+    if not sessions:
+        raise ValueError("No questions or sessions to replay")
+    return sessions
+
+
+class HttpTarget:
+    """POSTs questions to a running serve.py"""
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.worker_memory = {}
+        self.lock = threading.Lock()
+
+    def ask(self, question, chat_history):
+        body = json.dumps({"question": question, "chat_history": chat_history}).encode('utf-8')
+        request = urllib.request.Request(f"{self.url}/query", data=body,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["answer"]
+
+    def memory_mb(self):
+        """Total resident memory of the workers seen so far; /health lands on a random worker"""
+        for _ in range(4):
+            try:
+                with urllib.request.urlopen(f"{self.url}/health", timeout=10) as response:
+                    health = json.loads(response.read())
+            except OSError:
+                continue
+            if health.get("rss_mb") is not None:
+                with self.lock:
+                    self.worker_memory[health["pid"]] = health["rss_mb"]
+        with self.lock:
+            return round(sum(self.worker_memory.values()), 1) if self.worker_memory else None
+
+
+class InProcessTarget:
+    """Calls chat.answer_query in this process.
+
+    shared_memory=True uses the module's shared conversation memory (no
+    chat_history), which is what the CLI does and what grows without bound.
+    """
+
+    def __init__(self, shared_memory=False):
+        import chat
+
+        chat.load()
+        self.chat = chat
+        self.shared_memory = shared_memory
+
+    def ask(self, question, chat_history):
+        if self.shared_memory:
+            return self.chat.answer_query(question)["answer"]
+        return self.chat.answer_query(question, chat_history=chat_history)["answer"]
+
+    def memory_mb(self):
+        import serve
+        return serve.rss_mb()
+
+
+class LoadTest:
+    def __init__(self, target, sessions, rate, concurrency, duration, think_time=0.0, seed=None):
+        self.target = target
+        self.sessions = sessions
+        self.rate = rate
+        self.concurrency = max(1, concurrency)
+        self.duration = duration
+        self.think_time = think_time
+        self.random = random.Random(seed)
+
+        self.lock = threading.Lock()
+        self.results = []          # (finished_at, latency_ms, turn, error)
+        self.sessions_started = 0
+        self.sessions_expired = 0
+        self.queue_delays = []     # ms an open-loop session waited for a free student
+        self.timeline = []
+        self.started_at = None
+
+    def record(self, latency_ms, turn, error):
+        with self.lock:
+            self.results.append((time.monotonic() - self.started_at, latency_ms, turn, error))
+
+    def run_session(self, session, arrived_at=None):
+        """Run one session; with arrived_at (open loop) the first turn is timed from the arrival.
+
+        Timing from when a student picks the session up would leave the time
+        spent queued behind busy students out of the latencies (coordinated
+        omission), which hides exactly the overload a load test is for.
+        """
+        history = []
+        for turn, question in enumerate(session):
+            start = time.monotonic()
+            if turn == 0 and arrived_at is not None:
+                with self.lock:
+                    self.queue_delays.append((start - arrived_at) * 1000)
+                start = arrived_at
+            if time.monotonic() - self.started_at > self.duration:
+                if turn == 0 and arrived_at is not None:
+                    # Still queued when the test ended: the service never answered it
+                    with self.lock:
+                        self.sessions_expired += 1
+                    self.record((time.monotonic() - start) * 1000, turn,
+                                "Expired: still queued at the end of the test")
+                return
+            try:
+                answer = self.target.ask(question, history)
+            except Exception as e:
+                self.record((time.monotonic() - start) * 1000, turn, f"{type(e).__name__}: {e}")
+                return
+            self.record((time.monotonic() - start) * 1000, turn, None)
+            history.append([question, answer])
+            if self.think_time and turn < len(session) - 1:
+                time.sleep(self.random.expovariate(1 / self.think_time))
+
+    def next_session(self):
+        with self.lock:
+            self.sessions_started += 1
+            return self.random.choice(self.sessions)
+
+    def closed_loop(self, executor):
+        def student():
+            while time.monotonic() - self.started_at < self.duration:
+                self.run_session(self.next_session())
+
+        return [executor.submit(student) for _ in range(self.concurrency)]
+
+    def open_loop(self, executor):
+        # Arrivals beyond --concurrency sessions in flight wait in the executor queue
+        futures = []
+        arrival = 0.0
+        while True:
+            arrival += self.random.expovariate(self.rate)
+            if arrival >= self.duration:
+                return futures
+            time.sleep(max(0.0, arrival - (time.monotonic() - self.started_at)))
+            # Timed from the scheduled arrival, even if this loop fell behind
+            futures.append(executor.submit(self.run_session, self.next_session(), self.started_at + arrival))
+
+    def snapshot(self, since):
+        now = time.monotonic() - self.started_at
+        with self.lock:
+            window = [result for result in self.results if result[0] > since]
+            total = len(self.results)
+        errors = sum(1 for result in window if result[3])
+        point = {
+            "elapsed_s": round(now, 1),
+            "requests": total,
+            "throughput_rps": round(len(window) / max(now - since, 1e-9), 2),
+            "error_rate": round(errors / len(window), 4) if window else 0.0,
+            "memory_mb": self.target.memory_mb(),
+            **latency_summary([result[1] for result in window if not result[3]]),
+        }
+        self.timeline.append(point)
+        return point
+
+    def run(self, interval=10.0):
+        self.started_at = time.monotonic()
+        stop = threading.Event()
+
+        def reporter():
+            since = 0.0
+            while not stop.wait(interval):
+                point = self.snapshot(since)
+                since = point["elapsed_s"]
+                print(f"[{point['elapsed_s']:>6.1f}s] {point['throughput_rps']:6.2f} req/s  "
+                      f"p50 {point['p50_ms']} ms  p95 {point['p95_ms']} ms  p99 {point['p99_ms']} ms  "
+                      f"errors {100 * point['error_rate']:.1f}%  memory {point['memory_mb']} MB", file=sys.stderr)
+
+        self.snapshot(0.0)
+        thread = threading.Thread(target=reporter, daemon=True)
+        thread.start()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = self.open_loop(executor) if self.rate > 0 else self.closed_loop(executor)
+            for future in futures:
+                future.result()
+        stop.set()
+        thread.join()
+        return self.report()
+
+    def report(self):
+        elapsed = time.monotonic() - self.started_at
+        self.snapshot(self.timeline[-1]["elapsed_s"] if self.timeline else 0.0)
+        latencies = [result[1] for result in self.results if not result[3]]
+        errors = [result[3] for result in self.results if result[3]]
+
+        by_turn = {}
+        for _, latency, turn, error in self.results:
+            if not error:
+                by_turn.setdefault(turn + 1, []).append(latency)
+
+        memory = [point["memory_mb"] for point in self.timeline if point["memory_mb"] is not None]
+        return {
+            "duration_s": round(elapsed, 1),
+            "rate": self.rate,
+            "concurrency": self.concurrency,
+            "sessions": self.sessions_started,
+            "sessions_expired": self.sessions_expired,
+            "requests": len(self.results),
+            "throughput_rps": round(len(self.results) / elapsed, 2),
+            "error_rate": round(len(errors) / len(self.results), 4) if self.results else 0.0,
+            "errors": sorted(set(errors))[:10],
+            **latency_summary(latencies),
+            "queue_delay": latency_summary(self.queue_delays) if self.queue_delays else None,
+            # Later turns carry longer chat histories
+            "latency_by_turn": {turn: latency_summary(values) for turn, values in sorted(by_turn.items())},
+            "memory_start_mb": memory[0] if memory else None,
+            "memory_end_mb": memory[-1] if memory else None,
+            "memory_growth_mb_per_min": (round((memory[-1] - memory[0]) / (elapsed / 60), 2)
+                                         if len(memory) > 1 else None),
+            "timeline": self.timeline,
+        }
+
+
+def fake_embedding(text, dimension):
+    """Deterministic unit vector for a text (or a list of token ids)"""
+    seed = hashlib.sha256(json.dumps(text).encode('utf-8')).digest()
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dimension)]
+    norm = sum(value * value for value in vector) ** 0.5 or 1.0
+    return [value / norm for value in vector]
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Just enough of the OpenAI API for chat.py: chat completions and embeddings"""
+
+    protocol_version = "HTTP/1.1"
+    settings = {}
+
+    def delay(self, latency):
+        jitter = self.settings["jitter"]
+        time.sleep(max(0.0, latency * random.uniform(1 - jitter, 1 + jitter)))
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if random.random() < self.settings["error_rate"]:
+            self.send_json(500, {"error": {"message": "Injected failure", "type": "server_error"}})
+            return
+
+        if self.path.endswith("/embeddings"):
+            inputs = request["input"] if isinstance(request["input"], list) else [request["input"]]
+            # A list of token ids is one input, not many
+            if inputs and isinstance(inputs[0], int):
+                inputs = [inputs]
+            self.delay(self.settings["embedding_latency"])
+            data = []
+            for i, text in enumerate(inputs):
+                vector = fake_embedding(text, self.settings["dimension"])
+                if request.get("encoding_format") == "base64":
+                    vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode('ascii')
+                data.append({"object": "embedding", "index": i, "embedding": vector})
+            self.send_json(200, {"object": "list", "data": data, "model": request.get("model", "stub"),
+                                 "usage": {"prompt_tokens": 0, "total_tokens": 0}})
+        elif self.path.endswith("/chat/completions"):
+            self.delay(self.settings["llm_latency"])
+            prompt = request["messages"][-1]["content"]
+            self.send_json(200, {
+                "id": f"chatcmpl-stub-{random.getrandbits(32):x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                    "role": "assistant",
+                    "content": "Stub answer. " + " ".join(["lorem"] * self.settings["answer_words"]),
+                }}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": self.settings["answer_words"],
+                          "total_tokens": len(prompt) // 4 + self.settings["answer_words"]},
+            })
+        else:
+            self.send_json(404, {"error": {"message": "Not found"}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def index_dimension():
+    """Embedding dimension of the current index, which stub embeddings must match"""
+    import index_store
+    import chat
+
+    version = index_store.current_version(chat.INDEX_DIR)
+    if version is None:
+        return 1536
+    return index_store.read_manifest(chat.INDEX_DIR, version)["dimension"]
+
+
+def run_stub(args):
+    StubApiHandler.settings = {
+        "llm_latency": args.llm_latency,
+        "embedding_latency": args.embedding_latency,
+        "jitter": args.jitter,
+        "error_rate": args.error_rate,
+        "dimension": args.dimension or index_dimension(),
+        "answer_words": args.answer_words,
+    }
+    server = ThreadingHTTPServer((args.host, args.port), StubApiHandler)
+    print(f"Stub OpenAI API on http://{args.host}:{args.port}/v1 "
+          f"({StubApiHandler.settings['dimension']}d embeddings)", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def run_load(args):
+    sessions = load_sessions(args.questions, args.sessions)
+    if args.target == "inprocess":
+        target = InProcessTarget(shared_memory=args.shared_memory)
+    else:
+        target = HttpTarget(args.target, timeout=args.timeout)
+
+    test = LoadTest(target, sessions, rate=args.rate, concurrency=args.concurrency, duration=args.duration,
+                    think_time=args.think_time, seed=args.seed)
+    report = test.run(interval=args.interval)
+
+    print(f"\n{report['requests']} requests in {report['sessions']} sessions over {report['duration_s']}s: "
+          f"{report['throughput_rps']} req/s, p50 {report['p50_ms']} ms, p95 {report['p95_ms']} ms, "
+          f"p99 {report['p99_ms']} ms, {100 * report['error_rate']:.1f}% errors", file=sys.stderr)
+    print(f"Memory {report['memory_start_mb']} -> {report['memory_end_mb']} MB "
+          f"({report['memory_growth_mb_per_min']} MB/min)", file=sys.stderr)
+    if report["queue_delay"]:
+        print(f"Queued before a student was free: p50 {report['queue_delay']['p50_ms']} ms, "
+              f"p99 {report['queue_delay']['p99_ms']} ms; {report['sessions_expired']} sessions expired "
+              f"in the queue", file=sys.stderr)
+    for error in report["errors"]:
+        print(f"  error: {error}", file=sys.stderr)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the ChatAMCS chat service")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="replay questions and sessions against the service")
+    run.add_argument("--target", default="http://localhost:8000",
+                     help="URL of a running serve.py, or 'inprocess' to call answer_query directly")
+    run.add_argument("--rate", type=float, default=2.0,
+                     help="new sessions per second (Poisson arrivals); 0 runs --concurrency students back to back")
+    run.add_argument("--concurrency", type=int, default=32, help="sessions in flight at most")
+    run.add_argument("--duration", type=float, default=60.0, help="seconds to generate load for")
+    run.add_argument("--think-time", type=float, default=0.0, help="mean seconds between turns of a session")
+    run.add_argument("--questions", default=QUESTIONS_PATH, help="single questions, one per line")
+    run.add_argument("--sessions", default=SESSIONS_PATH, help="JSON Lines of {\"session\": [questions]}")
+    run.add_argument("--shared-memory", action="store_true",
+                     help="inprocess: use the shared conversation memory instead of chat_history")
+    run.add_argument("--interval", type=float, default=10.0, help="seconds between progress reports")
+    run.add_argument("--timeout", type=float, default=120.0, help="HTTP request timeout in seconds")
+    run.add_argument("--seed", type=int, help="random seed for arrivals and session choice")
+    run.add_argument("-o", "--output", help="write the report, with its timeline, to this JSON file")
+
+    stub = commands.add_parser("stub", help="serve a stub OpenAI API with injected latency")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8100)
+    stub.add_argument("--llm-latency", type=float, default=1.0, help="seconds per chat completion")
+    stub.add_argument("--embedding-latency", type=float, default=0.05, help="seconds per embeddings call")
+    stub.add_argument("--jitter", type=float, default=0.3, help="latencies vary by up to this fraction")
+    stub.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls that fail with 500")
+    stub.add_argument("--dimension", type=int, help="embedding dimension (default: that of the current index)")
+    stub.add_argument("--answer-words", type=int, default=60, help="length of the stub answers")
+
+    args = parser.parse_args()
+    if args.command == "stub":
+        run_stub(args)
+    else:
+        report = run_load(args)
+        sys.exit(1 if report["requests"] == 0 else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+import os
+import re
+import json
+import argparse
+import unicodedata
+
+# Entity resolution for the publication data. The same paper is listed in the
+# publications of every faculty member who wrote it and again in
+# Journal_Publication.json, Conference_Publications.json or book.json, each
+# time with slightly different spelling. resolve() merges these listings into
+# one canonical record per publication, linked to the faculty members among
+# its authors, so every publication is embedded exactly once.
+
+# Roles of the faculty profile entries that are publications; the other
+# entries are programmes attended, courses and patents
+AUTHOR_ROLES = {"main author", "co author"}
+
+HONORIFICS = r"^(?:dr|mr|mrs|ms|prof)\b\.?\s*"
+
+# Trailing descriptions and department codes found in the author lists
+AUTHOR_SUFFIXES = r"\s*(?:-|research scholar|(?:assistant |associate )?professor|student|mca)\s*$"
+DEPARTMENT_CODE = re.compile(r"^[A-Z]{2,4}$")
+
+KIND_LABELS = {
+    "journal": "Journal article",
+    "conference": "Conference paper",
+    "book": "Book",
+    "chapter": "Book chapter",
+    "publication": "Publication",
+}
+
+
+def normalize_title(title):
+    """Lower-cased title without accents, punctuation or repeated whitespace"""
+    text = unicodedata.normalize("NFKD", str(title or "")).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def clean_author(name):
+    """Author name as displayed, without role descriptions"""
+    name = re.sub(AUTHOR_SUFFIXES, "", " ".join(str(name or "").split()), flags=re.IGNORECASE)
+    return name.strip(" ,")
+
+
+def author_key(name):
+    """Key under which spellings of one author's name compare equal.
+
+    The files disagree on the order of initials and on spacing ("Dr. K.Balaji"
+    and "Dr.Balaji K", "M Senthilkumar" and "Dr.Senthil Kumar M"), so the key
+    is the sorted letters of the name without its honorific.
+    """
+    name = re.sub(HONORIFICS, "", clean_author(name).lower())
+    return "".join(sorted(re.sub(r"[^a-z]", "", name)))
+
+
+def split_authors(authors):
+    """Names in a comma separated author list, without department codes"""
+    names = []
+    for name in str(authors or "").split(","):
+        name = clean_author(name)
+        if name and not DEPARTMENT_CODE.match(name):
+            names.append(name)
+    return names
+
+
+def parse_year(value):
+    match = re.search(r"\b(19|20)\d{2}\b", str(value or ""))
+    return match.group(0) if match else ""
+
+
+def is_publication(entry):
+    """Whether a faculty profile entry is a publication"""
+    if not isinstance(entry, dict):
+        return bool(str(entry).strip())
+    return str(entry.get('role', '')).strip().lower() in AUTHOR_ROLES
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def listing(title, year, kind, venue, authors, source, faculty=None, volume=""):
+    return {"title": " ".join(str(title or "").split()), "year": parse_year(year), "kind": kind,
+            "venue": " ".join(str(venue or "").split()), "authors": authors, "source": source,
+            "faculty": faculty, "volume": str(volume or "").strip()}
+
+
+def faculty_listings(directory):
+    """Publications from the faculty profiles, attributed to the profile's faculty member"""
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            faculty = load_json(os.path.join(directory, filename))
+        except json.JSONDecodeError:
+            continue
+        for entry in faculty.get('publications', []):
+            if not is_publication(entry):
+                continue
+            if not isinstance(entry, dict):
+                entry = {"title": entry}
+            yield listing(entry.get('title'), entry.get('year'), "publication", entry.get('journal'),
+                          [faculty['name']], "faculty profile", faculty=faculty['name'],
+                          volume=entry.get('volume'))
+
+
+def journal_listings(path):
+    for group in load_json(path).get('publications', {}).values():
+        for pub in group:
+            yield listing(pub.get('title'), pub.get('year'), "journal", pub.get('publisher'),
+                          split_authors(pub.get('author')) + split_authors(pub.get('co_author')),
+                          os.path.basename(path))
+
+
+def conference_listings(path):
+    for group in load_json(path).get('publications', {}).values():
+        for pub in group:
+            yield listing(pub.get('title'), pub.get('year'), "conference", pub.get('conference'),
+                          split_authors(pub.get('author')) + split_authors(pub.get('co_authors')),
+                          os.path.basename(path))
+
+
+def book_listings(path):
+    publications = load_json(path).get('publications', {})
+    for book in publications.get('books', []):
+        yield listing(book.get('title'), book.get('year'), "book", book.get('publisher'),
+                      split_authors(book.get('author')) + split_authors(book.get('co_authors')),
+                      os.path.basename(path))
+    for contribution in publications.get('contributions', []):
+        kind = "chapter" if str(contribution.get('nature', '')).lower() == "chapter" else "publication"
+        yield listing(contribution.get('title'), contribution.get('date'), kind, "",
+                      split_authors(contribution.get('author')) + split_authors(contribution.get('contributor')),
+                      os.path.basename(path))
+
+
+def roster(directory):
+    """Faculty names by author key"""
+    names = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith(".json"):
+            try:
+                name = load_json(os.path.join(directory, filename)).get('name')
+            except json.JSONDecodeError:
+                continue
+            if name:
+                names[author_key(name)] = name
+    return names
+
+
+def collect_listings(inputs, base_dir):
+    """Every publication listing named by a source's inputs, in input order"""
+    readers = {
+        "faculty": faculty_listings,
+        "journals": journal_listings,
+        "conferences": conference_listings,
+        "books": book_listings,
+    }
+    listings = []
+    for kind, relative in inputs.items():
+        if kind not in readers:
+            raise ValueError(f"Unknown publication input: {kind}")
+        path = os.path.join(base_dir, relative)
+        if not os.path.exists(path):
+            print(f"Skipping publication input {relative}: not found")
+            continue
+        listings.extend(readers[kind](path))
+    return listings
+
+
+def merge(record, item, faculty_names):
+    """Fold one listing into a canonical record"""
+    record["sources"].append(item["source"])
+    # Faculty profiles only say "publication"; the dedicated files know better
+    if record["kind"] == "publication":
+        record["kind"] = item["kind"]
+    for field in ("year", "venue", "volume"):
+        if not record[field]:
+            record[field] = item[field]
+    if len(item["title"]) > len(record["title"]):
+        record["title"] = item["title"]
+
+    keys = {author_key(name) for name in record["authors"]}
+    for name in item["authors"]:
+        key = author_key(name)
+        if key and key not in keys:
+            keys.add(key)
+            record["authors"].append(faculty_names.get(key, name))
+        if key in faculty_names and faculty_names[key] not in record["faculty"]:
+            record["faculty"].append(faculty_names[key])
+    if item["faculty"] and item["faculty"] not in record["faculty"]:
+        record["faculty"].append(item["faculty"])
+
+
+def resolve(inputs, base_dir):
+    """Canonical publication records and resolution statistics.
+
+    Listings with the same normalized title are one publication unless both
+    carry years more than a year apart (a proceedings series reuses its title).
+    Listings whose title has no words, e.g. dates in a misaligned table row,
+    are dropped.
+    """
+    faculty_names = roster(os.path.join(base_dir, inputs['faculty'])) if inputs.get('faculty') else {}
+    listings = collect_listings(inputs, base_dir)
+
+    records = []
+    by_title = {}
+    skipped = 0
+    for item in listings:
+        key = normalize_title(item["title"])
+        if not re.search(r"[a-z]{2,}", key):
+            skipped += 1
+            continue
+        record = None
+        for candidate in by_title.get(key, []):
+            if not item["year"] or not candidate["year"] or abs(int(item["year"]) - int(candidate["year"])) <= 1:
+                record = candidate
+                break
+        if record is None:
+            record = {"title": item["title"], "year": "", "kind": item["kind"], "venue": "", "volume": "",
+                      "authors": [], "faculty": [], "sources": []}
+            by_title.setdefault(key, []).append(record)
+            records.append(record)
+        merge(record, item, faculty_names)
+
+    stats = {
+        "listings": len(listings),
+        "skipped": skipped,
+        "publications": len(records),
+        "merged": len(listings) - skipped - len(records),
+        "linked": sum(1 for record in records if record["faculty"]),
+    }
+    return records, stats
+
+
+def create_publication_record_text(record):
+    """Text of one canonical publication record"""
+    text = f"Title: {record['title']}\n"
+    text += f"Type: {KIND_LABELS.get(record['kind'], 'Publication')}\n"
+    if record['venue']:
+        text += f"Published in: {record['venue']}\n"
+    if record['volume'] and record['volume'] not in ("-", "-Select-"):
+        text += f"Volume: {record['volume']}\n"
+    text += f"Year: {record['year'] or 'Unknown'}\n"
+    if record['authors']:
+        text += f"Authors: {', '.join(record['authors'])}\n"
+    if record['faculty']:
+        text += f"AMCS Faculty: {', '.join(record['faculty'])}\n"
+    return text
+
+
+def group_by_faculty(records):
+    """(faculty member, records) groups, each record under the first faculty member among its authors.
+
+    Records linked to no faculty member are grouped under None. Every record
+    is in exactly one group, newest first.
+    """
+    groups = {}
+    for record in records:
+        groups.setdefault(record["faculty"][0] if record["faculty"] else None, []).append(record)
+    for faculty in sorted(groups, key=lambda name: (name is None, name or "")):
+        yield faculty, sorted(groups[faculty], key=lambda record: record["year"] or "0", reverse=True)
+
+
+def create_publications_header_text(faculty):
+    """Header of a chunk of publications grouped by group_by_faculty"""
+    if faculty is None:
+        return "Publications of the AMCS department:\n"
+    return f"Publications of {faculty} (AMCS faculty):\n"
+
+
+def create_publication_line_text(record):
+    """One canonical publication record as a line of a packed chunk"""
+    details = [KIND_LABELS.get(record['kind'], 'Publication')]
+    if record['venue']:
+        details.append(record['venue'])
+    if record['volume'] and record['volume'] not in ("-", "-Select-"):
+        details.append(f"Vol. {record['volume']}")
+    if record['year']:
+        details.append(record['year'])
+    text = f"- {record['title']} ({', '.join(details)})"
+    # Faculty members are always among the authors
+    if record['authors']:
+        text += f". Authors: {', '.join(record['authors'])}"
+    return text + "\n"
+
+
+def legacy_texts(inputs, base_dir):
+    """The publication text the per-file renderers and faculty profiles used to embed"""
+    import embeddings
+
+    renderers = {
+        "journals": embeddings.create_journal_publications_text,
+        "conferences": embeddings.create_conference_text,
+        "books": embeddings.create_publication_text,
+    }
+    texts = []
+    for kind, relative in inputs.items():
+        path = os.path.join(base_dir, relative)
+        if kind == "faculty":
+            texts.extend(embeddings.create_faculty_publications_text(faculty)
+                         for faculty in embeddings.load_json_directory(path))
+        elif kind in renderers and os.path.exists(path):
+            texts.append(renderers[kind](path))
+    return texts
+
+
+def report(config_path=None):
+    """Compare the resolved publication corpus with the one it replaces"""
+    import embeddings
+
+    sources = embeddings.load_sources(config_path or embeddings.SOURCES_PATH)
+    for name, source in sources.items():
+        if source.get('loader') != 'publications':
+            continue
+        base_dir = os.path.join(embeddings.ROOT_DIR, source['path'])
+        records, stats = resolve(source.get('inputs') or {}, base_dir)
+        before = legacy_texts(source.get('inputs') or {}, base_dir)
+        after = [doc.page_content for doc in embeddings.iter_source_documents(name, source)]
+
+        print(f"{name}: {stats['listings']} listings, {stats['skipped']} without a title, "
+              f"{stats['merged']} duplicates merged into {stats['publications']} publications "
+              f"({stats['linked']} linked to faculty)")
+        print(f"  documents (vectors): {len(before)} before (faculty profiles and publication files), "
+              f"{len(after)} after")
+        characters_before = sum(len(text) for text in before)
+        characters_after = sum(len(text) for text in after)
+        print(f"  characters embedded: {characters_before:,} before, {characters_after:,} after "
+              f"({100 * (characters_before - characters_after) / max(characters_before, 1):.0f}% fewer)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report how publication listings resolve into canonical records")
+    parser.add_argument("--config", help="path to the source registry")
+    parser.add_argument("--dump", action="store_true", help="print the canonical records as JSON")
+    args = parser.parse_args()
+
+    if args.dump:
+        import embeddings
+
+        for name, source in embeddings.load_sources(args.config or embeddings.SOURCES_PATH).items():
+            if source.get('loader') == 'publications':
+                records, _ = resolve(source.get('inputs') or {}, os.path.join(embeddings.ROOT_DIR, source['path']))
+                print(json.dumps(records, indent=2, ensure_ascii=False))
+        return
+    report(args.config)
+
+
+if __name__ == "__main__":
+    main()
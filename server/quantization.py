@@ -0,0 +1,191 @@
+import os
+import time
+import argparse
+import numpy as np
+import faiss
+from langchain_community.vectorstores import FAISS
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Compact vector storage for the index.
+#   flat   float32 vectors, exact search (what FAISS.from_documents used to build)
+#   fp16   half-precision scalar quantizer, 2 bytes per dimension
+#   int8   8-bit scalar quantizer, 1 byte per dimension
+#   pq     product quantizer, about d / 16 bytes per vector
+# Any of them can be combined with Matryoshka-style truncation to the first
+# `dimensions` components for models trained for it. Compressed indexes keep
+# the full-precision vectors in a .npy file next to the index; the best
+# candidates are re-scored against it through a memory map, so it stays on disk.
+QUANTIZATIONS = ("flat", "fp16", "int8", "pq")
+
+# Models whose embeddings keep their meaning when truncated
+MATRYOSHKA_MODELS = ("text-embedding-3-small", "text-embedding-3-large")
+
+# Candidates fetched from the compressed index per requested result
+RESCORE_FACTOR = int(os.getenv("RESCORE_FACTOR", "4"))
+
+QUESTIONS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.txt")
+
+
+def check_dimensions(embedding_model, full_dimension, dimensions):
+    if dimensions is None or dimensions == full_dimension:
+        return None
+    if not 0 < dimensions < full_dimension:
+        raise ValueError(f"dimensions must be between 1 and {full_dimension}, got {dimensions}")
+    if embedding_model not in MATRYOSHKA_MODELS:
+        raise ValueError(f"{embedding_model} embeddings cannot be truncated; "
+                         f"use one of {', '.join(MATRYOSHKA_MODELS)}")
+    return dimensions
+
+
+def truncate(matrix, dimensions):
+    """Keep the first `dimensions` components and re-normalize (Matryoshka truncation)"""
+    if dimensions is None:
+        return np.ascontiguousarray(matrix, dtype='float32')
+    truncated = np.ascontiguousarray(matrix[:, :dimensions], dtype='float32')
+    faiss.normalize_L2(truncated)
+    return truncated
+
+
+def pq_parameters(dimension, count):
+    """Number of sub-quantizers (a divisor of dimension, about dimension / 16) and bits per code"""
+    subquantizers = next(m for m in range(max(1, dimension // 16), 0, -1) if dimension % m == 0)
+    bits = max(1, min(8, int(np.log2(max(2, count)))))
+    return subquantizers, bits
+
+
+def make_index(matrix, quantization):
+    """Build and fill a FAISS index of the given quantization"""
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Unknown quantization: {quantization}")
+
+    dimension = matrix.shape[1]
+    if quantization == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    elif quantization == "fp16":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_L2)
+    elif quantization == "int8":
+        index = faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    else:
+        subquantizers, bits = pq_parameters(dimension, matrix.shape[0])
+        index = faiss.IndexPQ(dimension, subquantizers, bits, faiss.METRIC_L2)
+
+    if not index.is_trained:
+        index.train(matrix)
+    index.add(matrix)
+    return index
+
+
+def index_bytes(index):
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def rescore(full_vectors, query, candidate_ids, k):
+    """Exact L2 distances of the candidates against full-precision vectors, best k first"""
+    # Sorted ids read the memory-mapped file front to back
+    candidate_ids = np.sort(np.asarray([i for i in candidate_ids if i != -1], dtype='int64'))
+    if not len(candidate_ids):
+        return []
+    distances = ((np.asarray(full_vectors[candidate_ids]) - query) ** 2).sum(axis=1)
+    return [(int(candidate_ids[i]), float(distances[i])) for i in np.argsort(distances)[:k]]
+
+
+class RescoringFAISS(FAISS):
+    """FAISS over compressed vectors that re-scores candidates against full-precision vectors on disk"""
+
+    def __init__(self, *args, full_vectors, dimensions=None, rescore_factor=RESCORE_FACTOR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.full_vectors = full_vectors
+        self.dimensions = dimensions
+        self.rescore_factor = rescore_factor
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, filter=None, fetch_k=20, **kwargs):
+        query = np.asarray(embedding, dtype='float32')
+        _, indices = self.index.search(truncate(query[None, :], self.dimensions), k * self.rescore_factor)
+
+        results = []
+        for i, distance in rescore(self.full_vectors, query, indices[0], k):
+            doc = self.docstore.search(self.index_to_docstore_id[i])
+            results.append((doc, distance))
+        return results
+
+
+def load_questions(path=QUESTIONS_PATH):
+    with open(path, 'r', encoding='utf-8') as file:
+        return [line.strip() for line in file if line.strip() and not line.startswith("#")]
+
+
+def recall_at_k(expected, found, k):
+    hits = sum(len(set(e[:k]) & set(f[:k])) for e, f in zip(expected, found))
+    return hits / (k * len(expected))
+
+
+def quantization_report(vectors, queries, embedding_model, k=4, dimensions_options=(None,)):
+    """Memory and recall@k (against exact float32 search) of every storage option.
+
+    Returns one row per (quantization, dimensions) pair; recall is given both
+    straight from the compressed index and after re-scoring the candidates.
+    """
+    full = np.ascontiguousarray(vectors, dtype='float32')
+    queries = np.ascontiguousarray(queries, dtype='float32')
+    exact = faiss.IndexFlatL2(full.shape[1])
+    exact.add(full)
+    _, expected = exact.search(queries, k)
+    baseline_bytes = index_bytes(exact)
+
+    rows = []
+    for dimensions in dimensions_options:
+        dimensions = check_dimensions(embedding_model, full.shape[1], dimensions)
+        matrix = truncate(full, dimensions)
+        for quantization in QUANTIZATIONS:
+            index = make_index(matrix, quantization)
+            start = time.perf_counter()
+            _, found = index.search(truncate(queries, dimensions), k * RESCORE_FACTOR)
+            rescored = [[i for i, _ in rescore(full, query, ids, k)] for query, ids in zip(queries, found)]
+            elapsed = (time.perf_counter() - start) * 1000 / len(queries)
+
+            size = index_bytes(index)
+            rows.append({
+                "quantization": quantization,
+                "dimensions": dimensions or full.shape[1],
+                "index_bytes": size,
+                "memory_saved": round(1 - size / baseline_bytes, 4),
+                "recall": round(recall_at_k(expected, found, k), 4),
+                "recall_rescored": round(recall_at_k(expected, rescored, k), 4),
+                "ms_per_query": round(elapsed, 3),
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report memory saved against recall lost for each index storage option")
+    parser.add_argument("--questions", default=QUESTIONS_PATH, help="question set, one question per line")
+    parser.add_argument("--k", type=int, default=4, help="results compared per question")
+    parser.add_argument("--dimensions", type=int, nargs="*", default=[],
+                        help="also report Matryoshka truncation to these sizes")
+    args = parser.parse_args()
+
+    # Imported here so the report reuses the builder's configuration and cache
+    import embeddings as builder
+
+    vectors = []
+    for name in builder.load_sources():
+        cached = builder.read_source_cache(name)
+        if cached is None:
+            raise ValueError(f"Source {name} has not been built yet, run embeddings.py first")
+        vectors.extend(entry['embedding'] for entry in cached['documents'])
+
+    queries = builder.get_embeddings().embed_documents(load_questions(args.questions))
+    rows = quantization_report(vectors, queries, builder.get_embeddings().model, args.k, [None] + args.dimensions)
+
+    print(f"{len(vectors)} vectors, {len(queries)} questions, recall@{args.k} against exact float32 search\n")
+    print(f"{'storage':<8} {'dims':>5} {'bytes':>10} {'saved':>7} {'recall':>7} {'rescored':>9} {'ms/query':>9}")
+    for row in rows:
+        print(f"{row['quantization']:<8} {row['dimensions']:>5} {row['index_bytes']:>10} "
+              f"{row['memory_saved']:>7.1%} {row['recall']:>7.3f} {row['recall_rescored']:>9.3f} "
+              f"{row['ms_per_query']:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import contextvars
+from collections import Counter
+from typing import List
+from langchain_core.embeddings import Embeddings
+
+# Per-request state for answer_query. A RequestContext carries the normalized
+# question, every embedding computed for the request and the token counts
+# through the FAQ lookup, the condense step, retrieval and reranking. The
+# embeddings chat.py hands to the index are wrapped in RequestScopedEmbeddings,
+# so whichever stage asks for the embedding of a text inside a request gets the
+# one already computed. Every call that reaches the wrapped embeddings is
+# counted, and a text embedded successfully more than once in a request (a
+# stage bypassing the cache) is reported in the stats and logged.
+
+_current = contextvars.ContextVar("request_context", default=None)
+_encoding = None
+_encoding_loaded = False
+
+
+def normalize_question(text):
+    """The question with its whitespace collapsed, as embedded and answered"""
+    return " ".join(str(text).split())
+
+
+def get_encoding():
+    """The tiktoken encoding of the chat model, or None if it cannot be loaded.
+
+    tiktoken downloads an encoding the first time it is used; offline (e.g.
+    with the local embeddings backend) that fails, and the failure is
+    remembered so requests do not retry it.
+    """
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            try:
+                _encoding = tiktoken.encoding_for_model("gpt-4o-mini")
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"Token counts are estimated, the tiktoken encoding is unavailable: {type(e).__name__}: {e}")
+    return _encoding
+
+
+def count_tokens(text):
+    """Tokens of text for the chat model, counted with tiktoken or estimated at 4 characters a token"""
+    encoding = get_encoding()
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+def current():
+    """The RequestContext of the request being answered, or None"""
+    return _current.get()
+
+
+class RequestContext:
+    """One question on its way through answer_query; use it as a context manager"""
+
+    def __init__(self, question, chat_history=None):
+        self.question = normalize_question(question)
+        self.chat_history = chat_history
+        # The condense step may rewrite a follow-up into a standalone question
+        self.retrieval_question = self.question
+        self.vectors = {}
+        # Calls that reached the wrapped embeddings, per text, and those that raised
+        self.embedding_calls = Counter()
+        self.embedding_failures = Counter()
+        self.embeddings_reused = 0
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _current.reset(self._token)
+        repeated = self.repeated_embeddings()
+        if repeated:
+            print(f"Embedded more than once in one request: {repeated}")
+        return False
+
+    def set_retrieval_question(self, text):
+        self.retrieval_question = normalize_question(text)
+
+    def count_call(self, texts, call):
+        """Count a call to the wrapped embeddings for texts, failed or not"""
+        self.embedding_calls.update(texts)
+        try:
+            return call()
+        except Exception:
+            self.embedding_failures.update(texts)
+            raise
+
+    def embedding(self, text, embed_query):
+        """Embedding of text, computed with embed_query only the first time in this request"""
+        text = normalize_question(text)
+        vector = self.vectors.get(text)
+        if vector is not None:
+            self.embeddings_reused += 1
+            return vector
+
+        vector = self.vectors[text] = self.count_call([text], lambda: embed_query(text))
+        return vector
+
+    def repeated_embeddings(self):
+        """Texts the embeddings API embedded successfully more than once; retries of failed calls are fine"""
+        return sorted(text for text, calls in self.embedding_calls.items()
+                      if calls - self.embedding_failures[text] > 1)
+
+    def token_counts(self):
+        """Tokens of the question, the chat history and the rewritten question, counted on demand"""
+        counts = {"question": count_tokens(self.question)}
+        if self.chat_history:
+            counts["chat_history"] = sum(count_tokens(question) + count_tokens(answer)
+                                         for question, answer in self.chat_history)
+        if self.retrieval_question != self.question:
+            counts["retrieval_question"] = count_tokens(self.retrieval_question)
+        return counts
+
+    def stats(self):
+        return {
+            "embedding_calls": sum(self.embedding_calls.values()),
+            "embedding_failures": sum(self.embedding_failures.values()),
+            "embeddings_reused": self.embeddings_reused,
+            "repeated_embeddings": self.repeated_embeddings(),
+            "token_counts": self.token_counts(),
+            "token_counts_estimated": get_encoding() is None,
+        }
+
+
+class RequestScopedEmbeddings(Embeddings):
+    """Embeddings whose embed_query reuses the vectors of the current request"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        # What index manifests are checked against (embedding_backends.describe)
+        self.backend = getattr(embeddings, "backend", "openai")
+        self.model = embeddings.model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        context = current()
+        if context is None:
+            return self.embeddings.embed_documents(texts)
+        return context.count_call([normalize_question(text) for text in texts],
+                                  lambda: self.embeddings.embed_documents(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        context = current()
+        if context is None:
+            return self.embeddings.embed_query(text)
+        return context.embedding(text, self.embeddings.embed_query)
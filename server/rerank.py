@@ -0,0 +1,161 @@
+import os
+import re
+import math
+import time
+import threading
+from collections import Counter, deque
+from typing import Any, List
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain.schema import Document
+from dotenv import load_dotenv
+import request_context
+
+load_dotenv()
+
+# Over-fetch RERANK_FETCH_K candidates from FAISS, rescore them and keep only
+# the best RERANK_TOP_K for the prompt. RERANKER selects the scorer:
+#   lexical        BM25 over the candidates blended with the vector similarity (default)
+#   cross-encoder  a local sentence-transformers CrossEncoder (RERANK_MODEL)
+#   none           plain similarity search with RERANK_TOP_K results
+RERANKER = os.getenv("RERANKER", "lexical")
+RERANK_FETCH_K = int(os.getenv("RERANK_FETCH_K", "30"))
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "4"))
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+# Weight of the lexical score against the vector similarity
+LEXICAL_WEIGHT = float(os.getenv("RERANK_LEXICAL_WEIGHT", "0.5"))
+
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in",
+    "is", "it", "me", "of", "on", "or", "tell", "that", "the", "this", "to", "was", "what", "when",
+    "where", "which", "who", "whom", "whose", "why", "with", "about", "any", "there", "their",
+}
+
+_latencies = deque(maxlen=1000)
+_latencies_lock = threading.Lock()
+_cross_encoder = None
+
+
+def tokenize(text):
+    return [token for token in re.findall(r"\w+", text.lower()) if token not in STOPWORDS]
+
+
+def min_max(values):
+    low, high = min(values), max(values)
+    if high == low:
+        return [1.0 for _ in values]
+    return [(value - low) / (high - low) for value in values]
+
+
+def bm25_scores(question, texts, k1=1.5, b=0.75):
+    """BM25 scores of texts for question, with IDF taken over texts themselves"""
+    query_terms = set(tokenize(question))
+    documents = [Counter(tokenize(text)) for text in texts]
+    if not query_terms or not documents:
+        return [0.0 for _ in texts]
+
+    average_length = sum(sum(doc.values()) for doc in documents) / len(documents) or 1.0
+    scores = []
+    for doc in documents:
+        length = sum(doc.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = doc.get(term, 0)
+            if not frequency:
+                continue
+            containing = sum(1 for other in documents if term in other)
+            idf = math.log(1 + (len(documents) - containing + 0.5) / (containing + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+    return scores
+
+
+def lexical_rerank(question, candidates):
+    """Blend BM25 with the FAISS distance; candidates are (document, distance) pairs"""
+    lexical = min_max(bm25_scores(question, [doc.page_content for doc, _ in candidates]))
+    # Smaller distances are better
+    vector = min_max([-distance for _, distance in candidates])
+    return [LEXICAL_WEIGHT * l + (1 - LEXICAL_WEIGHT) * v for l, v in zip(lexical, vector)]
+
+
+def cross_encoder_rerank(question, candidates):
+    global _cross_encoder
+    if _cross_encoder is None:
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError:
+            raise ImportError("RERANKER=cross-encoder needs sentence-transformers: pip install sentence-transformers")
+        _cross_encoder = CrossEncoder(RERANK_MODEL, device="cpu")
+    scores = _cross_encoder.predict([(question, doc.page_content) for doc, _ in candidates])
+    return [float(score) for score in scores]
+
+
+RERANKERS = {
+    "lexical": lexical_rerank,
+    "cross-encoder": cross_encoder_rerank,
+}
+
+
+def record_latency(milliseconds):
+    with _latencies_lock:
+        _latencies.append(milliseconds)
+
+
+def rerank_latency():
+    """Summary of the most recent rerank latencies in milliseconds"""
+    with _latencies_lock:
+        latencies = sorted(_latencies)
+    if not latencies:
+        return {"count": 0, "mean_ms": None, "p95_ms": None}
+    return {
+        "count": len(latencies),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3),
+    }
+
+
+def rerank_candidates(question, candidates, reranker=RERANKER, top_k=RERANK_TOP_K):
+    """Best top_k documents of (document, distance) candidates, with their rerank score in metadata"""
+    if len(candidates) <= 1:
+        return [doc for doc, _ in candidates]
+
+    start = time.perf_counter()
+    scores = RERANKERS[reranker](question, candidates)
+    record_latency((time.perf_counter() - start) * 1000)
+
+    ranked = sorted(zip(scores, range(len(candidates))), key=lambda pair: pair[0], reverse=True)
+    documents = []
+    for score, i in ranked[:top_k]:
+        doc = candidates[i][0]
+        doc.metadata["rerank_score"] = round(float(score), 4)
+        documents.append(doc)
+    return documents
+
+
+class RerankingRetriever(BaseRetriever):
+    """Retriever that over-fetches from a vectorstore and keeps the best reranked documents"""
+
+    vectorstore: Any
+    reranker: str = RERANKER
+    fetch_k: int = RERANK_FETCH_K
+    top_k: int = RERANK_TOP_K
+
+    def _get_relevant_documents(
+            self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        # After the condense step query is the standalone question
+        context = request_context.current()
+        if context is not None:
+            context.set_retrieval_question(query)
+        candidates = self.vectorstore.similarity_search_with_score(query, k=max(self.fetch_k, self.top_k))
+        return rerank_candidates(query, candidates, self.reranker, self.top_k)
+
+
+def create_retriever(vectorstore):
+    """Retriever configured from the RERANK_* environment variables"""
+    if RERANKER == "none":
+        return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": RERANK_TOP_K})
+    if RERANKER not in RERANKERS:
+        raise ValueError(f"Unknown RERANKER: {RERANKER}")
+    return RerankingRetriever(vectorstore=vectorstore)
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import signal
+import socket
+import argparse
+import multiprocessing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Pre-fork server: the parent binds one listening socket and forks N worker
+# processes that all accept on it. Each worker searches the same memory-mapped
+# index.npy of a flat index (see index_store.MappedFlatIndex), so the vectors
+# sit once in the page cache however many workers there are, reads the same
+# SQLite docstore, and swaps to a new index version on its own as soon as
+# embeddings.py publishes one. Compressed indexes are read by each worker.
+
+chat = None
+
+
+def rss_mb(pid="self"):
+    """Resident memory of a process in MB (Linux), or the peak of this one elsewhere"""
+    try:
+        with open(f"/proc/{pid}/status", 'r') as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid != "self":
+        return None
+    import resource
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+class ChatRequestHandler(BaseHTTPRequestHandler):
+    """POST /query {"question": ..., "chat_history": [[q, a], ...]} and GET /health"""
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        import rerank
+
+        if self.path != "/health":
+            self.send_json(404, {"error": "Not found"})
+            return
+        chat.get_vectorstore()
+        self.send_json(200, {
+            "status": "ok",
+            "pid": os.getpid(),
+            "index_version": chat.get_index_version(),
+            "rerank_latency": rerank.rerank_latency(),
+            "rss_mb": rss_mb()
+        })
+
+    def do_POST(self):
+        if self.path != "/query":
+            self.send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            question = request["question"]
+            chat_history = [tuple(turn) for turn in request.get("chat_history", [])]
+        except (ValueError, KeyError, TypeError):
+            self.send_json(400, {"error": "Expected a JSON body with a 'question'"})
+            return
+
+        try:
+            response = chat.answer_query(question, chat_history=chat_history)
+        except Exception as e:
+            print(f"Error answering {question!r}: {str(e)}")
+            self.send_json(500, {"error": str(e)})
+            return
+
+        self.send_json(200, {
+            "answer": response["answer"],
+            "sources": [doc.metadata.get('name', 'Unknown') for doc in response["source_documents"]],
+            "index_version": chat.get_index_version(),
+            "request": response.get("request")
+        })
+
+    def log_message(self, format, *args):
+        print(f"[worker {os.getpid()}] {self.address_string()} {format % args}")
+
+
+def run_worker(listen_socket):
+    global chat
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    # Clients are created after the fork so every worker gets its own connections
+    import chat as chat_module
+    chat = chat_module
+    chat.load()
+
+    server = ThreadingHTTPServer(listen_socket.getsockname(), ChatRequestHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = listen_socket
+    print(f"Worker {os.getpid()} ready on index {chat.get_index_version()}")
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the ChatAMCS chat bot from several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    listen_socket = socket.create_server((args.host, args.port), backlog=128)
+    context = multiprocessing.get_context("fork")
+
+    def start_worker():
+        process = context.Process(target=run_worker, args=(listen_socket,), daemon=True)
+        process.start()
+        return process
+
+    workers = [start_worker() for _ in range(max(1, args.workers))]
+    print(f"Serving on {args.host}:{args.port} with {len(workers)} workers")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    # Replace workers that die until asked to stop
+    while not stopping:
+        time.sleep(1)
+        for i, process in enumerate(workers):
+            if not process.is_alive() and not stopping:
+                print(f"Worker {process.pid} exited with {process.exitcode}, restarting")
+                workers[i] = start_worker()
+
+    for process in workers:
+        process.terminate()
+    for process in workers:
+        process.join()
+    listen_socket.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import os
+import json
+import shutil
+import tempfile
+import unittest
+import faq
+
+# Run from server/: python -m unittest test_faq
+
+
+def course(code, title, credits):
+    return {"code": code, "title": title, "credits": credits}
+
+
+def course_entries(courses, program="B.Sc Computer Systems and Design", year="2020"):
+    """FAQ entries for courses of one regulation, each title and code occurring once"""
+    return [{"entity": c["code"], "hash": "", "pairs": faq.course_pairs(c, program, year, True, True)}
+            for c in courses]
+
+
+class ExactMatchTest(unittest.TestCase):
+    def test_laboratory_course_is_not_its_theory_course(self):
+        store = faq.FaqStore(course_entries([
+            course("21X204", "DATA STRUCTURES", "3 0 0 3"),
+            course("21X207", "DATA STRUCTURES LABORATORY", "0 0 4 2"),
+        ]))
+        qa = store.match("How many credits is Data Structures Laboratory in B.Sc Computer Systems and Design 2020?")
+        self.assertIn("carries 2 credits", qa["answer"])
+        qa = store.match("How many credits is Data Structures in B.Sc Computer Systems and Design 2020?")
+        self.assertIn("carries 3 credits", qa["answer"])
+
+    def test_questions_with_different_answers_fall_through(self):
+        first = {"entity": "a", "hash": "", "pairs": [faq.pair(["Who is the HOD?"], "A", "Department")]}
+        second = {"entity": "b", "hash": "", "pairs": [faq.pair(["Who is the HOD?"], "B", "Department")]}
+        self.assertIsNone(faq.FaqStore([first, second]).match("Who is the HOD?"))
+        self.assertEqual(faq.FaqStore([first, first]).match("Who is the HOD?")["answer"], "A")
+
+
+class NearDuplicateTest(unittest.TestCase):
+    def setUp(self):
+        self.store = faq.FaqStore(course_entries([
+            course("23XDA6", "Adverserial Machine Learning", "3 2 0 4"),
+            course("24X0", "Ae Cryptography", "3 0 0 3"),
+        ], program="M.Sc Data Science", year="2023"))
+
+    def test_part_of_a_title_does_not_match(self):
+        self.assertIsNone(self.store.match("How many credits is machine learning?"))
+        self.assertIsNone(self.store.match("How many credits is cryptography?"))
+
+    def test_more_than_the_title_does_not_match(self):
+        store = faq.FaqStore(course_entries([
+            course("21X204", "Data Structures", "3 0 0 3"),
+            course("21X208", "Operating Systems Laboratory", "0 0 4 2"),
+        ]))
+        self.assertIsNone(store.match("How many credits is Data Structures Laboratory?"))
+        self.assertIsNone(store.match("How many credits is Data Structures Lab?"))
+
+    def test_rephrased_question_matches(self):
+        qa = self.store.match("how many credits for adverserial machine learning")
+        self.assertIn("23XDA6", qa["answer"])
+
+
+class PartialRebuildTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.root, "regulations"))
+        self.cache_path = os.path.join(self.root, "cache", "faq.json")
+        self.config = {"courses": {"path": "regulations", "source": "regulations"}}
+        self.write_credits("3 0 0 3")
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def write_credits(self, credits):
+        regulation = {"program_name": "M.Sc Data Science", "year": "2023",
+                      "courses": [course("23XD01", "Graph Theory", credits)]}
+        with open(os.path.join(self.root, "regulations", "msc.json"), 'w', encoding='utf-8') as file:
+            json.dump(regulation, file)
+
+    def answer(self, rebuilt_sources):
+        entries = faq.build_faq(self.config, self.root, self.cache_path, rebuilt_sources=rebuilt_sources)
+        return faq.FaqStore(entries).match("How many credits is Graph Theory?")["answer"]
+
+    def test_cached_source_keeps_its_answers(self):
+        self.assertEqual(faq.stale_sources(self.config, self.cache_path), ["regulations"])
+        self.assertIn("carries 3 credits", self.answer(["regulations"]))
+        self.assertEqual(faq.stale_sources(self.config, self.cache_path), [])
+
+        # The data changed, but the regulations source is taken from the cache
+        self.write_credits("3 1 0 4")
+        self.assertIn("carries 3 credits", self.answer(["faculty"]))
+        self.assertIn("carries 4 credits", self.answer(["regulations"]))
+
+    def test_changed_section_config_is_stale(self):
+        self.answer(["regulations"])
+        self.config["courses"]["source"] = "courses"
+        self.assertEqual(faq.stale_sources(self.config, self.cache_path), ["courses"])
+
+
+if __name__ == "__main__":
+    unittest.main()